@@ -0,0 +1,334 @@
+"""
+File: benchmark_synthetic.py
+
+Synthetic-tree benchmark for cc_loc_counter.
+
+- Generates a reproducible C++ tree (same seed and options -> same files):
+    * --depth levels of headers below the translation units (TUs); every file
+      includes --fanout files of the next level, so closures overlap.
+    * headers are spread over --dirs directories; a --duplicates fraction
+      reuses the basename of another header in a different directory.
+    * a --relative fraction of includes is written as a relative path
+      ("../d3/h_000123.hpp") instead of a bare basename.
+    * each file has --lines-min..--lines-max body lines, of which about
+      --comment-density are '//' or '/* */' comment lines.
+  The expected LOC of every file is recorded in a manifest next to the tree,
+  and the benchmark checks the counted LOC against it.
+- Times, per --jobs value (best and median of --repeat runs):
+    * build_index      : enumeration and basename index
+    * discover_closure : include closures of all TUs (scan + resolve)
+    * count            : LOC of the union of the closures
+    * end_to_end       : all of the above, including worker start-up
+  The phase breakdown of the best run (see phase_profiler.py) is included.
+- Writes a JSON report; --compare OLD.json prints the ratio of each timing to
+  an earlier report made with the same tree options.
+
+Runs offline with the standard library only.
+
+Usage:
+        python benchmark_synthetic.py [--headers 10000] [--tus 200] [--fanout 6] [--depth 5]
+                                      [--dirs 200] [--duplicates 0.05] [--relative 0.1]
+                                      [--lines-min 20] [--lines-max 200]
+                                      [--comment-density 0.3] [--seed 1]
+                                      [--jobs 1 0] [--repeat 3] [--tree DIR]
+                                      [--json report.json] [--compare old.json]
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from analyzer.cc_loc_counter import DEFAULT_EXTS, IncludeDiscovery, create_executor
+from analyzer.file_enumeration import WALKERS
+from analyzer.phase_profiler import PhaseProfiler
+
+MANIFEST_NAME = "bench_manifest.json"
+TIMINGS = ["build_index", "discover_closure", "count", "end_to_end"]
+
+
+def tree_config(args) -> dict:
+    return {
+        "headers": args.headers, "tus": args.tus, "fanout": args.fanout,
+        "depth": args.depth, "dirs": args.dirs, "duplicates": args.duplicates,
+        "relative": args.relative, "lines_min": args.lines_min,
+        "lines_max": args.lines_max, "comment_density": args.comment_density,
+        "seed": args.seed,
+    }
+
+
+def _file_body(rng: random.Random, n_lines: int, comment_density: float) -> Tuple[List[str], int]:
+    """Body lines and how many of them count as code (blank lines excluded)."""
+    lines: List[str] = []
+    code = 0
+    while len(lines) < n_lines:
+        r = rng.random()
+        if r < comment_density * 0.6:
+            lines.append(f"// comment {len(lines)}")
+        elif r < comment_density:
+            block = rng.randint(2, 5)
+            lines.append("/*")
+            lines.extend(f" * block comment line {i}" for i in range(block - 2))
+            lines.append(" */")
+        elif r < comment_density + 0.05:
+            lines.append("")
+        else:
+            lines.append(f"inline int f_{len(lines)}(int x) {{ return x + {len(lines)}; }}")
+            code += 1
+    return lines, code
+
+
+def generate_tree(root: str, config: dict) -> Dict[str, int]:
+    """Write the tree under root and return {relative path: expected LOC}."""
+    rng = random.Random(config["seed"])
+    depth = max(1, config["depth"])
+    n_dirs = max(1, config["dirs"])
+
+    # Headers by level (1..depth); each header is (relative dir, basename)
+    per_level = max(1, config["headers"] // depth)
+    levels: List[List[Tuple[str, str]]] = []
+    names: List[str] = []
+    serial = 0
+    for level in range(depth):
+        headers = []
+        for _ in range(per_level):
+            if names and rng.random() < config["duplicates"]:
+                bn = rng.choice(names)
+            else:
+                bn = f"h_{serial:06d}.hpp"
+                serial += 1
+                names.append(bn)
+            headers.append((os.path.join(f"d{rng.randrange(n_dirs)}", f"l{level}"), bn))
+        levels.append(headers)
+    tus = [(os.path.join("src", f"s{i % n_dirs}"), f"tu_{i:05d}.cpp") for i in range(config["tus"])]
+
+    def include_line(from_dir: str, target: Tuple[str, str]) -> str:
+        if rng.random() < config["relative"]:
+            rel = os.path.relpath(os.path.join(target[0], target[1]), from_dir)
+            return f'#include "{rel.replace(os.sep, "/")}"'
+        return f'#include "{target[1]}"'
+
+    expected: Dict[str, int] = {}
+    files: List[Tuple[Tuple[str, str], List[Tuple[str, str]]]] = [(tu, levels[0]) for tu in tus]
+    for level in range(depth):
+        below = levels[level + 1] if level + 1 < depth else []
+        files.extend((h, below) for h in levels[level])
+
+    for (rel_dir, bn), candidates in files:
+        rel = os.path.join(rel_dir, bn)
+        if rel in expected:
+            continue  # same basename drawn twice into the same directory
+        includes = [include_line(rel_dir, t)
+                    for t in (rng.sample(candidates, min(config["fanout"], len(candidates)))
+                              if candidates else [])]
+        body, code = _file_body(rng, rng.randint(config["lines_min"], config["lines_max"]),
+                                config["comment_density"])
+        lines = ["#pragma once"] + includes + body
+        os.makedirs(os.path.join(root, rel_dir), exist_ok=True)
+        with open(os.path.join(root, rel), "w", encoding="utf-8", newline="\n") as f:
+            f.write("\n".join(lines) + "\n")
+        expected[rel] = 1 + len(includes) + code
+    return expected
+
+
+def prepare_tree(tree_dir: str, config: dict) -> Dict[str, int]:
+    """Reuse tree_dir if it was generated with the same config, otherwise regenerate it."""
+    manifest_path = os.path.join(tree_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("config") == config:
+            return manifest["expected"]
+    except (OSError, ValueError):
+        pass
+
+    if os.path.isdir(tree_dir) and os.listdir(tree_dir):
+        if not os.path.exists(manifest_path):
+            # Never delete a directory this script did not generate
+            print(f"[ERROR] {tree_dir} is not empty and holds no {MANIFEST_NAME}.", file=sys.stderr)
+            sys.exit(2)
+        shutil.rmtree(tree_dir)
+    os.makedirs(tree_dir)
+    t0 = time.perf_counter()
+    expected = generate_tree(tree_dir, config)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"config": config, "expected": expected}, f)
+    print(f"[INFO] Generated {len(expected)} files in {tree_dir} "
+          f"({time.perf_counter() - t0:.1f}s)", file=sys.stderr)
+    return expected
+
+
+def run_once(root: str, start_paths: List[str], jobs: int, walker: str) -> Tuple[dict, dict, Dict[str, int]]:
+    """One end-to-end run. Returns (timings, phase breakdown, {path: LOC})."""
+    profiler = PhaseProfiler()
+    t_start = time.perf_counter()
+    executor = create_executor(jobs)
+    try:
+        t0 = time.perf_counter()
+        discovery = IncludeDiscovery(root, DEFAULT_EXTS, executor=executor, jobs=jobs,
+                                     walker=walker, profiler=profiler)
+        t1 = time.perf_counter()
+        unique: Dict[str, str] = {}
+        for start_path in start_paths:
+            for p in discovery.closure(start_path):
+                unique.setdefault(os.path.basename(p), p)
+        t2 = time.perf_counter()
+        locs = {p: discovery.loc(p) for p in unique.values()}
+        t3 = time.perf_counter()
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    timings = {
+        "build_index": t1 - t0,
+        "discover_closure": t2 - t1,
+        "count": t3 - t2,
+        "end_to_end": time.perf_counter() - t_start,
+    }
+    return timings, profiler.as_dict(), locs
+
+
+def check_locs(root: str, locs: Dict[str, int], expected: Dict[str, int]) -> List[str]:
+    """Files whose counted LOC differs from the generator's (relative paths)."""
+    return [os.path.relpath(p, root) for p, loc in locs.items()
+            if expected.get(os.path.relpath(p, root)) != loc]
+
+
+def benchmark(root: str, expected: Dict[str, int], jobs_list: List[int],
+              repeat: int, walker: str) -> dict:
+    start_paths = sorted(os.path.join(root, rel) for rel in expected if rel.endswith(".cpp"))
+    runs = []
+    for jobs in jobs_list:
+        samples = []
+        best_profile = None
+        locs: Dict[str, int] = {}
+        for _ in range(repeat):
+            timings, profile, locs = run_once(root, start_paths, jobs, walker)
+            if not samples or timings["end_to_end"] < min(s["end_to_end"] for s in samples):
+                best_profile = profile
+            samples.append(timings)
+        mismatches = check_locs(root, locs, expected)
+        if mismatches:
+            print(f"[ERROR] jobs={jobs}: {len(mismatches)} files counted differently than "
+                  f"generated, e.g. {mismatches[:3]}", file=sys.stderr)
+        runs.append({
+            "jobs": jobs,
+            "best": {k: round(min(s[k] for s in samples), 6) for k in TIMINGS},
+            "median": {k: round(statistics.median(s[k] for s in samples), 6) for k in TIMINGS},
+            "phases": best_profile,
+            "files_counted": len(locs),
+            "total_loc": sum(locs.values()),
+            "valid": not mismatches,
+        })
+    return {"runs": runs}
+
+
+def print_report(report: dict, baseline: dict = None) -> None:
+    tree = report["tree"]
+    print(f"# Synthetic tree: {tree['files']} files, {tree['bytes'] / 2 ** 20:.1f} MiB, "
+          f"{tree['tus']} TUs (repeat {report['repeat']}, walker {report['walker']})")
+    base_runs = {r["jobs"]: r for r in (baseline or {}).get("runs", [])}
+    header = f"{'jobs':>5s} " + " ".join(f"{k:>17s}" for k in TIMINGS) + "  valid"
+    print(header)
+    for run in report["runs"]:
+        cells = []
+        base = base_runs.get(run["jobs"])
+        for k in TIMINGS:
+            cell = f"{run['best'][k]:.4f}"
+            if base:
+                ratio = base["best"][k] / run["best"][k] if run["best"][k] > 0 else float("inf")
+                cell += f" ({ratio:.2f}x)"
+            cells.append(f"{cell:>17s}")
+        print(f"{run['jobs']:5d} " + " ".join(cells) + f"  {run['valid']}")
+    if baseline:
+        print("# (Nx) = speedup over the --compare report; < 1 is a regression.")
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Benchmark cc_loc_counter on a generated, reproducible C++ tree.")
+    ap.add_argument("--headers", type=int, default=10000, help="Number of headers (default: 10000).")
+    ap.add_argument("--tus", type=int, default=200, help="Number of .cpp translation units (default: 200).")
+    ap.add_argument("--fanout", type=int, default=6, help="Includes per file (default: 6).")
+    ap.add_argument("--depth", type=int, default=5, help="Header levels below the TUs (default: 5).")
+    ap.add_argument("--dirs", type=int, default=200, help="Directories headers are spread over (default: 200).")
+    ap.add_argument("--duplicates", type=float, default=0.05,
+                    help="Fraction of headers reusing an existing basename (default: 0.05).")
+    ap.add_argument("--relative", type=float, default=0.1,
+                    help="Fraction of includes written as relative paths (default: 0.1).")
+    ap.add_argument("--lines-min", type=int, default=20, help="Minimum body lines per file (default: 20).")
+    ap.add_argument("--lines-max", type=int, default=200, help="Maximum body lines per file (default: 200).")
+    ap.add_argument("--comment-density", type=float, default=0.3,
+                    help="Approximate fraction of comment lines (default: 0.3).")
+    ap.add_argument("--seed", type=int, default=1, help="Random seed (default: 1).")
+    ap.add_argument("--jobs", type=int, nargs="+", default=[1],
+                    help="--jobs values to benchmark, e.g. 1 4 0 (default: 1).")
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per --jobs value (default: 3).")
+    ap.add_argument("--walker", choices=WALKERS, default="os-walk",
+                    help="File enumeration backend (default: os-walk).")
+    ap.add_argument("--tree", default=None,
+                    help="Directory for the generated tree; reused while the options are unchanged "
+                         "(default: a directory in the temp folder named after the options).")
+    ap.add_argument("--json", help="Optional path to write the JSON report.")
+    ap.add_argument("--compare", help="Earlier JSON report to compare the timings with.")
+    args = ap.parse_args()
+
+    config = tree_config(args)
+    tree_dir = args.tree or os.path.join(
+        tempfile.gettempdir(),
+        "cc_loc_bench_" + "_".join(f"{v}" for v in config.values()))
+    tree_dir = os.path.realpath(tree_dir)
+    expected = prepare_tree(tree_dir, config)
+
+    report = {
+        "config": config,
+        "repeat": args.repeat,
+        "walker": args.walker,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "tree": {
+            "path": tree_dir,
+            "files": len(expected),
+            "tus": sum(1 for rel in expected if rel.endswith(".cpp")),
+            "bytes": sum(os.path.getsize(os.path.join(tree_dir, rel)) for rel in expected),
+        },
+    }
+    report.update(benchmark(tree_dir, expected, args.jobs, args.repeat, args.walker))
+
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.compare, encoding="utf-8") as f:
+                baseline = json.load(f)
+            if baseline.get("config") != config:
+                print("[WARN] --compare report was made with different tree options.", file=sys.stderr)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Failed to read {args.compare}: {e}", file=sys.stderr)
+    print_report(report, baseline)
+
+    if args.json:
+        try:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"\nJSON written to: {os.path.abspath(args.json)}")
+        except Exception as e:
+            print(f"[WARN] Failed to write JSON: {e}", file=sys.stderr)
+
+    if not all(run["valid"] for run in report["runs"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+File: buffer_scanner.py
+
+Buffer-wide comment/include scanner used by cc_loc_counter.scan_file.
+
+Instead of decoding the file and walking it line by line in Python, the whole
+buffer is processed with C-level operations (bytes.find, compiled regexes):
+  - The next '/*' is located with a single find. All lines before it cannot
+    be part of a block comment, so they are classified in bulk by counting
+    newlines, blank lines and '//' lines over that span. The regexes start
+    with a literal '\n' (the end of the previous line), which lets the regex
+    engine skip ahead with a fast search instead of trying every position.
+  - The line holding '/*' (and, if the comment stays open, every line up to
+    the first '*/') is a comment line, exactly as in the line-based rules.
+Large files are read through mmap so they are never copied into memory.
+
+The results are identical to the line-by-line scanner (scan_file_by_lines):
+  - Pure ASCII buffers without '\\r' are scanned as raw bytes.
+  - Anything else is decoded with the same UTF-8 "ignore" policy and newline
+    translation as text-mode open(), and the same algorithm runs on the str,
+    where the regex whitespace class matches str.lstrip().
+"""
+from __future__ import annotations
+import hashlib
+import mmap
+import os
+import re
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple, Union
+
+# Files at least this large are mapped instead of read
+MMAP_THRESHOLD = 256 * 1024
+
+Buffer = Union[bytes, mmap.mmap, str]
+
+
+class _Patterns:
+    """Tokens and regexes for one buffer type (bytes or str)."""
+
+    def __init__(self, ws: str, to_type):
+        t = to_type
+        self.nl = t("\n")
+        self.open = t("/*")
+        self.close = t("*/")
+        self.slash = t("//")
+        # Kind of a line: group is '\n' for a blank line, '//' for a line comment
+        kind = ws + r"*(\n|//)"
+        include = ws + r'*#' + ws + r'*include' + ws + r'*[<"]([^">\n]+)[">]'
+        # "after_nl" variants match at the newline that ends the previous line
+        self.kind = re.compile(t(kind))
+        self.kind_after_nl = re.compile(t(r"\n(?=" + kind + ")"))
+        self.include = re.compile(t(include))
+        self.include_after_nl = re.compile(t(r"\n" + include))
+        self.blank_tail = re.compile(t(ws + r"*"))
+
+
+# str.lstrip() whitespace, minus the newline that separates lines
+_STR = _Patterns(r"[^\S\n]", str)
+# The ASCII subset of the same class (bytes regexes only know [ \t\n\r\f\v])
+_BYTES = _Patterns(r"[ \t\x0b\x0c\x1c-\x1f]", lambda s: s.encode("ascii"))
+
+_ASCII_CHECK_CHUNK = 1 << 20
+
+
+def _is_plain_ascii(buf: Union[bytes, mmap.mmap]) -> bool:
+    """True if buf needs neither UTF-8 decoding nor newline translation."""
+    if isinstance(buf, bytes):
+        if not buf.isascii():
+            return False
+    else:
+        # mmap has no isascii(); checking copied chunks beats a regex scan
+        for start in range(0, len(buf), _ASCII_CHECK_CHUNK):
+            if not buf[start:start + _ASCII_CHECK_CHUNK].isascii():
+                return False
+    return buf.find(b"\r") == -1
+
+
+def _count_newlines(buf: Buffer, start: int, end: int) -> int:
+    if isinstance(buf, mmap.mmap):
+        # mmap has no count(); a slice copy is much cheaper than a regex pass
+        return buf[start:end].count(b"\n")
+    return buf.count(_BYTES.nl if isinstance(buf, bytes) else "\n", start, end)
+
+
+def _decode_include(token) -> str:
+    if isinstance(token, bytes):
+        token = token.decode("utf-8", errors="ignore")
+    return token.strip()
+
+
+def _scan_normalized(buf: Buffer, pat: _Patterns) -> Tuple[List[str], int, int]:
+    """Scan a buffer whose only line terminator is '\\n'."""
+    includes: List[str] = []
+    code_lines = 0
+    blank_lines = 0
+    n = len(buf)
+    pos = 0  # always the start of a line outside any block comment
+
+    while pos < n:
+        open_idx = buf.find(pat.open, pos)
+        if open_idx == -1:
+            seg_end = n
+        else:
+            seg_end = buf.rfind(pat.nl, pos, open_idx) + 1 or pos
+
+        # Lines in [pos, seg_end) contain no '/*': only '//', blank or code
+        if seg_end > pos:
+            if pos == 0:
+                # The first line of the file has no preceding newline
+                kinds = [m.group(1) for m in [pat.kind.match(buf, 0, seg_end)] if m]
+                m = pat.include.match(buf, 0, seg_end)
+                if m:
+                    includes.append(_decode_include(m.group(1)))
+                search_from = 0
+            else:
+                kinds = []
+                search_from = pos - 1
+            kinds += pat.kind_after_nl.findall(buf, search_from, seg_end)
+            includes.extend(_decode_include(token) for token in
+                            pat.include_after_nl.findall(buf, search_from, seg_end))
+
+            lines = _count_newlines(buf, pos, seg_end)
+            blanks = kinds.count(pat.nl)
+            slashes = len(kinds) - blanks
+            if buf[seg_end - 1:seg_end] != pat.nl:
+                # Unterminated last line of the file
+                tail_start = max(buf.rfind(pat.nl, pos, seg_end) + 1, pos)
+                lines += 1
+                if pat.blank_tail.fullmatch(buf, tail_start, seg_end):
+                    blanks += 1
+            blank_lines += blanks
+            code_lines += lines - blanks - slashes
+
+        if open_idx == -1:
+            break
+
+        # The line holding the first '/*' is a comment line either way
+        line_end = buf.find(pat.nl, open_idx)
+        if line_end == -1:
+            line_end = n
+        pos = line_end + 1
+
+        m = pat.include.match(buf, seg_end, line_end)
+        if m:
+            includes.append(_decode_include(m.group(1)))
+        m = pat.kind.match(buf, seg_end, line_end)
+        if m and m.group(1) == pat.slash:
+            # '//' line: the '/*' is inside the line comment
+            continue
+        if buf.find(pat.close, open_idx + 2, line_end) != -1:
+            # Closed on the same line; the rest of the line is ignored
+            continue
+
+        # Open block: every line up to the one holding the next '*/'
+        close_idx = buf.find(pat.close, pos)
+        if close_idx == -1:
+            break
+        close_end = buf.find(pat.nl, close_idx)
+        pos = n if close_end == -1 else close_end + 1
+
+    return includes, code_lines, blank_lines
+
+
+def scan_buffer(buf: Buffer) -> Tuple[List[str], int, int]:
+    """
+    Return (includes, code_lines, blank_lines) for a raw file buffer
+    (bytes or mmap) or for already-decoded text (str).
+    """
+    if isinstance(buf, str):
+        text = buf
+    elif _is_plain_ascii(buf):
+        return _scan_normalized(buf, _BYTES)
+    else:
+        text = bytes(buf).decode("utf-8", errors="ignore")
+    # Same newline translation as open(..., "r")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return _scan_normalized(text, _STR)
+
+
+@contextmanager
+def _file_buffer(path: str) -> Iterator[Union[bytes, mmap.mmap]]:
+    """The content of a file on disk, mapped into memory if it is large."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size and size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield mm
+        else:
+            yield f.read()
+
+
+def scan_path(path: str) -> Tuple[List[str], int, int]:
+    """Scan a file on disk, mapping it into memory if it is large."""
+    with _file_buffer(path) as buf:
+        return scan_buffer(buf)
+
+
+def scan_path_sha1(path: str) -> Tuple[Tuple[List[str], int, int], str]:
+    """scan_path, plus the SHA-1 of the scanned buffer (for loc_cache), from a single read."""
+    with _file_buffer(path) as buf:
+        return scan_buffer(buf), hashlib.sha1(buf).hexdigest()
@@ -18,21 +18,65 @@ C/C++ source tree line counter with include resolution.
   (Optionally, blank-only lines may be excluded from the count via a flag.)
 
 Usage:
-        python cc_loc_counter.py [start.cpp] [--root /path/to/root]
+        python cc_loc_counter.py [start.cpp ...] [--glob 'test/**/*.cpp']
+                                                         [--root /path/to/root]
                                                          [--include-blanks] [--csv out.csv]
-                                                         [--list-only]
+                                                         [--list-only] [--jobs N]
+                                                         [--cache [cache.json]]
+                                                         [--walker os-walk|scandir|git]
+                                                         [--graph-report [N]]
+                                                         [--rev COMMIT | --diff A..B |
+                                                          --history RANGE]
 
 Notes:
 - If the starting file argument is omitted, a native file selection dialog
     (e.g., Windows Explorer) will appear to let you choose a C/C++ file.
+- With --jobs N, include parsing and line counting are spread across N worker
+    processes. The discovered file order and the totals are identical to the
+    serial run.
+- With --cache, each file's include list and LOC are stored on disk (keyed by
+    path, size, mtime and content hash), so repeat runs only re-read files
+    that changed. See loc_cache.py.
+- Batch mode: with several start files (or --glob), the index is built once,
+    each file is scanned and resolved once, and every start file is reported
+    as a translation unit, followed by the union of all closures (deduped by
+    basename) and its total.
+- With --graph-report, the include graph is kept and analysed: closure size
+    per translation unit, header fan-in and the heaviest include edges
+    (see include_graph_report.py).
+- With --rev COMMIT, files are read from git objects at that revision without a
+    checkout; --diff A..B reports per-file LOC changes between two revisions
+    (see git_rev_loc.py). --history RANGE prints one CSV/NDJSON row per commit;
+    only blobs not seen before are read, so the cost scales with churn.
+- --compact-index stores the basename index as directory IDs plus file names;
+    --stream prints each file's LOC as soon as it is counted and keeps no
+    scans, so memory stays flat on very large roots (see compact_index.py).
+- --profile reports time, files, bytes and throughput per phase (index, scan,
+    resolve, count); --profile-ndjson appends the same as one JSON line per run
+    and --cprofile dumps cProfile stats (see phase_profiler.py).
+- Include resolution is memoized per (including directory, target); with
+    --profile the hit rate is reported on stderr.
 """
 from __future__ import annotations
 import argparse
+import glob
 import os
 import re
 import sys
-from collections import deque
-from typing import Dict, Set, List, Tuple, Optional
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Mapping, Set, List, Tuple, Optional
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from analyzer.buffer_scanner import scan_path, scan_path_sha1
+from analyzer.compact_index import AllPathsView, CompactIndex, FirstPathView
+from analyzer.file_enumeration import DEFAULT_PRUNE, WALKERS, iter_files
+from analyzer.include_graph_report import IncludeGraph, print_graph_report
+from analyzer.loc_cache import DEFAULT_CACHE_PATH, LocCache
+from analyzer.phase_profiler import PhaseProfiler
 
 # Recognized source/header extensions
 DEFAULT_EXTS = [
@@ -42,56 +86,155 @@ DEFAULT_EXTS = [
 
 INCLUDE_RE = re.compile(r'^\s*#\s*include\s*[<"]([^">]+)[">]')
 
+# iter_closure(keep=False): scans kept for reuse by later closures (headers shared
+# by several translation units), and the size at which the resolve cache is cleared
+STREAM_SCAN_LRU_SIZE = 256
+STREAM_RESOLVE_CACHE_LIMIT = 100000
+
 
 def is_code_like(path: str, exts: List[str]) -> bool:
     _, ext = os.path.splitext(path)
     return ext.lower() in exts
 
 
-def build_index(root: str, exts: List[str]) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+def build_index(root: str, exts: List[str], walker: str = "os-walk",
+                prune: Optional[List[str]] = None,
+                compact: bool = False) -> Tuple[Mapping[str, str], Mapping[str, List[str]]]:
     """
     Walk root and build:
       - name_to_path: map of basename -> first path found (preferred path)
       - name_to_all_paths: map of basename -> all matching paths (for diagnostics)
+    The files are enumerated with the given walker (see file_enumeration.py).
+    With compact=True both maps are read-only views over a CompactIndex,
+    which stores a directory ID per file instead of full path strings.
     """
+    if compact:
+        index = CompactIndex()
+        for p in iter_files(root, walker, prune):
+            if is_code_like(p, exts):
+                index.add(p)
+        return FirstPathView(index), AllPathsView(index)
+
     name_to_path: Dict[str, str] = {}
     name_to_all_paths: Dict[str, List[str]] = {}
-    for dirpath, _, filenames in os.walk(root):
-        for fn in filenames:
-            if is_code_like(fn, exts):
-                p = os.path.join(dirpath, fn)
-                bn = os.path.basename(fn)
-                if bn not in name_to_path:
-                    name_to_path[bn] = p
-                name_to_all_paths.setdefault(bn, []).append(p)
+    for p in iter_files(root, walker, prune):
+        bn = os.path.basename(p)
+        if is_code_like(bn, exts):
+            if bn not in name_to_path:
+                name_to_path[bn] = p
+            name_to_all_paths.setdefault(bn, []).append(p)
     return name_to_path, name_to_all_paths
 
 
-def parse_includes(file_path: str) -> List[str]:
-    """Return list of include targets (raw tokens, e.g., 'foo.h' or 'sub/dir/foo.hpp')."""
+def scan_file(path: str) -> Tuple[List[str], int, int]:
+    """
+    Read a file once and return (includes, code_lines, blank_lines):
+      - includes: include targets (raw tokens, e.g., 'foo.h' or 'sub/dir/foo.hpp').
+        #include lines inside a /* ... */ block are skipped.
+      - code_lines: non-comment, non-blank lines.
+      - blank_lines: non-comment lines that are blank after stripping whitespace.
+    Comment lines are classified as described in count_non_comment_lines.
+    The file is scanned as a whole buffer (see buffer_scanner.py).
+    """
+    try:
+        return scan_path(path)
+    except Exception as e:
+        print(f"[WARN] Failed to read {path}: {e}", file=sys.stderr)
+        return [], 0, 0
+
+
+def scan_file_sha1(path: str) -> Tuple[Tuple[List[str], int, int], Optional[str]]:
+    """
+    scan_file, plus the SHA-1 of the content that was scanned (None if the
+    file could not be read), so the cache does not read the file again.
+    """
+    try:
+        return scan_path_sha1(path)
+    except Exception as e:
+        print(f"[WARN] Failed to read {path}: {e}", file=sys.stderr)
+        return ([], 0, 0), None
+
+
+def scan_file_by_lines(path: str) -> Tuple[List[str], int, int]:
+    """
+    Line-by-line reference implementation of scan_file.
+    Slower, but it states the classification rules directly.
+    """
     includes: List[str] = []
+    code_lines = 0
+    blank_lines = 0
+    in_block = False
+
     try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            for line in f:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            for raw in f:
+                line = raw.rstrip("\n")
+                stripped = line.lstrip()
+
+                if in_block:
+                    # Entire line is a comment line until we see */
+                    end_idx = stripped.find("*/")
+                    if end_idx != -1:
+                        in_block = False
+                    # Comment line -> skip counting
+                    continue
+
+                # Outside block comments, so an include here is compiled
                 m = INCLUDE_RE.match(line)
                 if m:
                     includes.append(m.group(1).strip())
+
+                # Line starting with //
+                if stripped.startswith("//"):
+                    continue
+
+                # Detect /* ... */
+                start_idx = stripped.find("/*")
+                if start_idx != -1:
+                    # Begin block comment on this line; treat this entire line as comment
+                    end_idx = stripped.find("*/", start_idx + 2)
+                    if end_idx == -1:
+                        in_block = True
+                    # Either way, skip counting this line
+                    continue
+
+                # Non-comment line
+                if stripped == "":
+                    blank_lines += 1
+                else:
+                    code_lines += 1
     except Exception as e:
-        print(f"[WARN] Failed to read {file_path}: {e}", file=sys.stderr)
-    return includes
+        print(f"[WARN] Failed to read {path}: {e}", file=sys.stderr)
+
+    return includes, code_lines, blank_lines
+
+
+def parse_includes(file_path: str) -> List[str]:
+    """Return list of include targets (raw tokens, e.g., 'foo.h' or 'sub/dir/foo.hpp')."""
+    return scan_file(file_path)[0]
+
+
+def scan_loc(scan: Tuple[List[str], int, int], exclude_blank: bool = True) -> int:
+    """Return the LOC of a scan_file result."""
+    _, code_lines, blank_lines = scan
+    return code_lines if exclude_blank else code_lines + blank_lines
 
 
 def resolve_include(root: str,
                     including_file: str,
                     target: str,
-                    name_to_path: Dict[str, str]) -> Optional[str]:
+                    name_to_path: Dict[str, str],
+                    root_real: Optional[str] = None) -> Optional[str]:
     """
     Resolve include target to a path within root.
     Resolution strategy (within the root only):
       1) If the target contains path separators, try relative to including_file's dir.
       2) Fallback: by basename using name_to_path (first discovered path).
     Returns None if not found within root.
+    root_real is os.path.realpath(root); pass it to avoid recomputing it per call.
     """
+    if root_real is None:
+        root_real = os.path.realpath(root)
     # If include looks like "sub/dir/foo.h": try relative to including file dir
     if os.sep in target or "/" in target:
         # Normalize both styles of separators
@@ -102,7 +245,6 @@ def resolve_include(root: str,
         # Ensure candidate is under root
         try:
             cand_real = os.path.realpath(candidate)
-            root_real = os.path.realpath(root)
             if cand_real.startswith(root_real + os.sep) or cand_real == root_real:
                 if os.path.exists(cand_real):
                     return cand_real
@@ -117,7 +259,6 @@ def resolve_include(root: str,
     if path:
         try:
             path_real = os.path.realpath(path)
-            root_real = os.path.realpath(root)
             if path_real.startswith(root_real + os.sep) or path_real == root_real:
                 return path
         except Exception:
@@ -125,55 +266,295 @@ def resolve_include(root: str,
     return None
 
 
+def _total_size(paths: List[str]) -> int:
+    total = 0
+    for p in paths:
+        try:
+            total += os.path.getsize(p)
+        except OSError:
+            pass
+    return total
+
+
+def resolve_jobs(jobs: int) -> int:
+    """Number of workers for --jobs: jobs <= 0 means one per CPU."""
+    return jobs if jobs > 0 else os.cpu_count() or 1
+
+
+def create_executor(jobs: int) -> Optional[Executor]:
+    """
+    Return a process pool with `jobs` workers, or None for a serial run.
+    jobs <= 0 means one worker per CPU.
+    """
+    jobs = resolve_jobs(jobs)
+    if jobs == 1:
+        return None
+    return ProcessPoolExecutor(max_workers=jobs)
+
+
+def map_files(func: Callable, paths: List[str], executor: Optional[Executor] = None,
+              jobs: int = 1) -> list:
+    """
+    Apply func to every path, in worker processes if an executor is given.
+    jobs is the executor's number of workers (it sets the chunk size).
+    Results are always returned in the order of `paths`.
+    """
+    if executor is None or len(paths) <= 1:
+        return [func(p) for p in paths]
+    chunksize = max(1, len(paths) // (resolve_jobs(jobs) * 4))
+    return list(executor.map(func, paths, chunksize=chunksize))
+
+
+def map_files_cached(func: Callable, paths: List[str], executor: Optional[Executor] = None,
+                     cache: Optional[LocCache] = None, field: str = "", jobs: int = 1,
+                     func_sha1: Optional[Callable] = None) -> list:
+    """
+    Same as map_files, but values found in the cache under `field` are reused
+    and only the remaining paths are computed (and then stored).
+    func_sha1, if given, is used for those paths instead of func: it returns
+    (value, SHA-1 of the content it read), so the cache need not hash the file.
+    """
+    if cache is None:
+        return map_files(func, paths, executor, jobs)
+    results: Dict[str, object] = {}
+    missing: List[str] = []
+    for p in paths:
+        value = cache.get(p, field)
+        if value is None:
+            missing.append(p)
+        else:
+            results[p] = value
+    if func_sha1 is None:
+        for p, value in zip(missing, map_files(func, missing, executor, jobs)):
+            cache.put(p, field, value)
+            results[p] = value
+    else:
+        for p, (value, sha1) in zip(missing, map_files(func_sha1, missing, executor, jobs)):
+            if sha1 is not None:
+                cache.put(p, field, value, sha1)
+            results[p] = value
+    return [results[p] for p in paths]
+
+
+class IncludeDiscovery:
+    """
+    Include closure discovery within one root.
+
+    The basename index is built once, and every file's scan and include
+    resolution are memoized, so any number of start files (translation units)
+    share the work. Closures are deduped by basename.
+    If an executor is given, the files of each BFS level are scanned in parallel
+    (jobs is its number of workers, as passed to create_executor).
+    If a cache is given, scan results of unchanged files are taken from it.
+    walker and prune select how the root is enumerated (see build_index), and
+    compact selects the compact basename index.
+    If a profiler is given, time, files and bytes are recorded per phase
+    (see phase_profiler.py).
+    name_maps passes a prebuilt (name_to_path, name_to_all_paths) index instead
+    of enumerating root (git_rev_loc builds it from a revision's tree).
+
+    Include resolution is memoized by (including directory, target), since the
+    same pairs repeat across headers and each miss costs realpath/exists calls.
+    Targets without a directory part resolve the same from any directory, so
+    they share one entry.
+    """
+
+    def __init__(self, root: str, exts: List[str],
+                 executor: Optional[Executor] = None,
+                 cache: Optional[LocCache] = None,
+                 walker: str = "os-walk",
+                 prune: Optional[List[str]] = None,
+                 compact: bool = False,
+                 profiler: Optional[PhaseProfiler] = None,
+                 name_maps: Optional[Tuple[Dict[str, str], Dict[str, List[str]]]] = None,
+                 jobs: int = 1):
+        self.root = root
+        self.exts = exts
+        self.executor = executor
+        self.jobs = jobs
+        self.cache = cache
+        self.profiler = profiler
+        if name_maps is not None:
+            self.name_to_path, self.name_to_all_paths = name_maps
+        elif profiler is None:
+            self.name_to_path, self.name_to_all_paths = build_index(
+                root, exts, walker, prune, compact)
+        else:
+            with profiler.phase("index") as stats:
+                self.name_to_path, self.name_to_all_paths = build_index(
+                    root, exts, walker, prune, compact)
+                stats.files += sum(len(v) for v in self.name_to_all_paths.values())
+        self.index: Optional[CompactIndex] = self.name_to_path.index if compact else None
+        # path -> scan_file result
+        self.scans: Dict[str, Tuple[List[str], int, int]] = {}
+        # path -> resolved include paths (includes not found under root are dropped)
+        self.resolved: Dict[str, List[str]] = {}
+        self.root_real = os.path.realpath(root)
+        # (including directory or "", target) -> resolve_include result
+        self.resolve_cache: Dict[Tuple[str, str], Optional[str]] = {}
+        self.resolve_hits = 0
+        self.resolve_misses = 0
+        # Files whose scans iter_closure(keep=False) keeps, least recently used first
+        self._stream_lru: "OrderedDict[str, None]" = OrderedDict()
+        # Paths already counted, so the count phase reports unique files
+        self._counted: Set[str] = set()
+
+    def add_start(self, start_path: str) -> str:
+        """Make sure start_path's basename is indexed and return the path used for it."""
+        start_bn = os.path.basename(start_path)
+        if start_bn not in self.name_to_path:
+            # Ensure start is included in the index if it wasn't by extension filtering
+            if is_code_like(start_path, self.exts):
+                if self.index is not None:
+                    self.index.add(start_path)
+                else:
+                    self.name_to_path[start_bn] = start_path
+                    self.name_to_all_paths.setdefault(start_bn, []).append(start_path)
+            else:
+                print(
+                    f"[ERROR] Start file {start_path} does not look like a C/C++ source/header with known extensions.",
+                    file=sys.stderr)
+                sys.exit(2)
+        return self.name_to_path[start_bn]
+
+    def scan_many(self, paths: List[str]) -> None:
+        """Scan every path that has not been scanned yet."""
+        missing = [p for p in paths if p not in self.scans]
+        if self.profiler is None:
+            results = map_files_cached(scan_file, missing, self.executor, self.cache, "scan",
+                                       self.jobs, scan_file_sha1)
+        else:
+            with self.profiler.phase("scan", len(missing), _total_size(missing)):
+                results = map_files_cached(scan_file, missing, self.executor, self.cache, "scan",
+                                           self.jobs, scan_file_sha1)
+        for p, scan in zip(missing, results):
+            self.scans[p] = scan
+
+    def includes_of(self, path: str) -> List[str]:
+        """Resolved include paths of an already scanned file, in include order."""
+        resolved = self.resolved.get(path)
+        if resolved is None:
+            t0 = time.perf_counter() if self.profiler is not None else 0.0
+            resolved = []
+            for inc in self.scans[path][0]:
+                r = self.resolve(path, inc)
+                # Not found locally under root -> ignore (likely system header)
+                if r:
+                    resolved.append(r)
+            self.resolved[path] = resolved
+            if self.profiler is not None:
+                stats = self.profiler.phases["resolve"]
+                stats.seconds += time.perf_counter() - t0
+                stats.files += 1
+        return resolved
+
+    def resolve(self, including_file: str, target: str) -> Optional[str]:
+        """Resolve one include target (see resolve_include)."""
+        has_dir = os.sep in target or "/" in target
+        key = (os.path.dirname(including_file) if has_dir else "", target)
+        if key in self.resolve_cache:
+            self.resolve_hits += 1
+            return self.resolve_cache[key]
+        self.resolve_misses += 1
+        resolved = resolve_include(self.root, including_file, target,
+                                   self.name_to_path, self.root_real)
+        self.resolve_cache[key] = resolved
+        return resolved
+
+    def invalidate_resolution(self) -> None:
+        """Forget resolved includes, e.g. after files were added to or removed from root."""
+        self.resolved.clear()
+        self.resolve_cache.clear()
+
+    def closure(self, start_path: str) -> List[str]:
+        """Return the ordered list of unique file paths reachable from start_path (start first)."""
+        return [path for path, _ in self.iter_closure(start_path)]
+
+    def iter_closure(self, start_path: str,
+                     keep: bool = True) -> Iterator[Tuple[str, Tuple[List[str], int, int]]]:
+        """
+        Yield (path, scan_file result) for the files of closure(start_path), in
+        the same order, as soon as each BFS level has been scanned.
+        With keep=False the scan and resolved includes of a file are dropped
+        once it has been yielded, except for the STREAM_SCAN_LRU_SIZE most
+        recently used files (so headers shared by the next translation units
+        are not scanned again), and the resolve cache is cleared whenever it
+        reaches STREAM_RESOLVE_CACHE_LIMIT entries. The basename index still
+        grows with the root (see --compact-index).
+        """
+        seen_names: Set[str] = set()
+        lru = self._stream_lru
+
+        # Seed
+        first_path = self.add_start(start_path)
+        frontier: List[Tuple[str, str]] = [(first_path, os.path.basename(first_path))]
+
+        # BFS over includes while deduping by basename, one level at a time
+        while frontier:
+            # Accept the level in queue order first. Acceptance never depends on
+            # the includes of the same level, so the order matches a plain FIFO BFS.
+            level: List[str] = []
+            for path, bn in frontier:
+                if bn in seen_names:
+                    continue
+                seen_names.add(bn)
+                level.append(path)
+
+            # Scan the level (possibly in parallel), then resolve in order
+            self.scan_many(level)
+            frontier = []
+            for path in level:
+                for resolved in self.includes_of(path):
+                    inc_bn = os.path.basename(resolved)
+                    if inc_bn not in seen_names:
+                        frontier.append((resolved, inc_bn))
+                scan = self.scans[path]
+                if not keep:
+                    lru[path] = None
+                    lru.move_to_end(path)
+                    if len(lru) > STREAM_SCAN_LRU_SIZE:
+                        evicted, _ = lru.popitem(last=False)
+                        self.scans.pop(evicted, None)
+                        self.resolved.pop(evicted, None)
+                yield path, scan
+            if not keep and len(self.resolve_cache) >= STREAM_RESOLVE_CACHE_LIMIT:
+                self.resolve_cache.clear()
+
+    def loc(self, path: str, exclude_blank: bool = True) -> int:
+        """LOC of a file discovered by closure()."""
+        return self.scan_loc(path, self.scans[path], exclude_blank)
+
+    def scan_loc(self, path: str, scan: Tuple[List[str], int, int],
+                 exclude_blank: bool = True) -> int:
+        """LOC from the scan of path; the count phase counts each path once."""
+        if self.profiler is None:
+            return scan_loc(scan, exclude_blank)
+        first = path not in self._counted
+        self._counted.add(path)
+        with self.profiler.phase("count", int(first)):
+            return scan_loc(scan, exclude_blank)
+
+
 def discover_closure(
-        start_path: str, root: str, exts: List[str]
+        start_path: str, root: str, exts: List[str],
+        executor: Optional[Executor] = None,
+        cache: Optional[LocCache] = None,
+        scans: Optional[Dict[str, Tuple[List[str], int, int]]] = None,
+        jobs: int = 1
 ) -> Tuple[List[str], Dict[str, str], Dict[str, List[str]]]:
     """
     From start_path, recursively discover all included files (within root) while
     deduping by basename. Returns the ordered list of unique file paths (start first),
     along with name_to_path and name_to_all_paths for diagnostics.
+    If a scans dict is given, it is filled with the scan_file result of every
+    discovered path, so the files need not be read again for counting.
+    See IncludeDiscovery for executor, jobs and cache.
     """
-    name_to_path, name_to_all_paths = build_index(root, exts)
-
-    start_bn = os.path.basename(start_path)
-    if start_bn not in name_to_path:
-        # Ensure start is included in the index if it wasn't by extension filtering
-        if is_code_like(start_path, exts):
-            name_to_path[start_bn] = start_path
-            name_to_all_paths.setdefault(start_bn, []).append(start_path)
-        else:
-            print(
-                f"[ERROR] Start file {start_path} does not look like a C/C++ source/header with known extensions.",
-                file=sys.stderr)
-            sys.exit(2)
-
-    # BFS/DFS over includes while deduping by basename
-    ordered_paths: List[str] = []
-    seen_names: Set[str] = set()
-    q: deque[Tuple[str, str]] = deque()  # (path, basename)
-
-    # Seed
-    first_path = name_to_path[start_bn] if start_bn in name_to_path else start_path
-    q.append((first_path, start_bn))
-
-    while q:
-        path, bn = q.popleft()
-        if bn in seen_names:
-            continue
-        seen_names.add(bn)
-        ordered_paths.append(path)
-
-        # Parse includes and resolve
-        for inc in parse_includes(path):
-            resolved = resolve_include(root, path, inc, name_to_path)
-            if not resolved:
-                # Not found locally under root -> ignore (likely system header)
-                continue
-            inc_bn = os.path.basename(resolved)
-            if inc_bn not in seen_names:
-                q.append((resolved, inc_bn))
-
-    return ordered_paths, name_to_path, name_to_all_paths
+    discovery = IncludeDiscovery(root, exts, executor=executor, cache=cache, jobs=jobs)
+    ordered_paths = discovery.closure(start_path)
+    if scans is not None:
+        scans.update(discovery.scans)
+    return ordered_paths, discovery.name_to_path, discovery.name_to_all_paths
 
 
 def count_non_comment_lines(path: str, exclude_blank: bool = True) -> int:
@@ -187,45 +568,7 @@ def count_non_comment_lines(path: str, exclude_blank: bool = True) -> int:
     NOTE: This is a simplified lexer and does not handle string literals that
     contain comment-like tokens.
     """
-    loc = 0
-    in_block = False
-
-    try:
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            for raw in f:
-                line = raw.rstrip("\n")
-                stripped = line.lstrip()
-
-                if in_block:
-                    # Entire line is a comment line until we see */
-                    end_idx = stripped.find("*/")
-                    if end_idx != -1:
-                        in_block = False
-                    # Comment line -> skip counting
-                    continue
-
-                # Line starting with //
-                if stripped.startswith("//"):
-                    continue
-
-                # Detect /* ... */
-                start_idx = stripped.find("/*")
-                if start_idx != -1:
-                    # Begin block comment on this line; treat this entire line as comment
-                    end_idx = stripped.find("*/", start_idx + 2)
-                    if end_idx == -1:
-                        in_block = True
-                    # Either way, skip counting this line
-                    continue
-
-                # Non-comment line
-                if exclude_blank and stripped == "":
-                    continue
-                loc += 1
-    except Exception as e:
-        print(f"[WARN] Failed to read {path}: {e}", file=sys.stderr)
-
-    return loc
+    return scan_loc(scan_file(path), exclude_blank)
 
 
 def ensure_within_root(path: str, root: str) -> None:
@@ -276,59 +619,64 @@ def _select_file_via_gui(exts: List[str]) -> Optional[str]:
     return filename
 
 
-def main():
-    ap = argparse.ArgumentParser(
-        description=(
-            "Count non-comment LOC for a C/C++ source file and its local #includes "
-            "(within the same directory tree). If no start file is provided, a "
-            "file selection dialog will open."
-        ))
-    ap.add_argument("start", nargs="?", default=None,
-                    help="Path to the starting C/C++ file. If omitted, a GUI file chooser opens.")
-    ap.add_argument(
-        "--root", help="Restrict search to this root (default: directory of start file).", default=None)
-    ap.add_argument("--exts", nargs="*", default=DEFAULT_EXTS,
-                    help=f"File extensions considered as code (default: {DEFAULT_EXTS})")
-    ap.add_argument("--include-blanks", action="store_true",
-                    help="Count blank-only lines as code (default: exclude blanks).")
-    ap.add_argument(
-        "--csv", help="Optional path to write a CSV report (file,loc).")
-    ap.add_argument("--list-only", action="store_true",
-                    help="Only list discovered files (no counting).")
-    args = ap.parse_args()
+def _default_root(start_paths: List[str]) -> str:
+    """Parent of the (common) directory of the start files."""
+    start_dir = os.path.commonpath([os.path.dirname(p) for p in start_paths])
+    # Default to the parent of the start file's directory (one level up)
+    parent_dir = os.path.abspath(os.path.join(start_dir, os.pardir))
+    # If the parent directory is the same as start_dir (e.g., start_dir is a drive root),
+    # fall back to using start_dir as the root.
+    if os.path.realpath(parent_dir) == os.path.realpath(start_dir):
+        return start_dir
+    return parent_dir
 
-    # Resolve start file: from CLI or via GUI file chooser
-    start_arg = args.start
-    if not start_arg:
+
+def _collect_start_paths(args) -> List[str]:
+    """Start files from the CLI, the --glob patterns, or the GUI file chooser."""
+    start_args: List[str] = list(args.start)
+    for pattern in args.glob or []:
+        matches = sorted(p for p in glob.glob(pattern, recursive=True)
+                         if os.path.isfile(p) and is_code_like(p, args.exts))
+        if not matches:
+            print(f"[WARN] No C/C++ files match: {pattern}", file=sys.stderr)
+        start_args.extend(matches)
+
+    if not start_args:
+        if args.glob:
+            print("[ERROR] No start files found.", file=sys.stderr)
+            sys.exit(1)
         selected = _select_file_via_gui(args.exts)
         if not selected:
             print("[ERROR] No file selected.", file=sys.stderr)
             sys.exit(1)
-        start_arg = selected
+        start_args = [selected]
 
-    start_path = os.path.abspath(start_arg)
-    if not os.path.exists(start_path):
-        print(f"[ERROR] Start file not found: {start_path}", file=sys.stderr)
-        sys.exit(1)
+    start_paths: List[str] = []
+    for start_arg in start_args:
+        start_path = os.path.abspath(start_arg)
+        if not os.path.exists(start_path):
+            print(f"[ERROR] Start file not found: {start_path}", file=sys.stderr)
+            sys.exit(1)
+        if start_path not in start_paths:
+            start_paths.append(start_path)
+    return start_paths
 
-    if args.root:
-        root = os.path.abspath(args.root)
-    else:
-        # Default to the parent of the start file's directory (one level up)
-        start_dir = os.path.dirname(start_path)
-        parent_dir = os.path.abspath(os.path.join(start_dir, os.pardir))
-        # If the parent directory is the same as start_dir (e.g., start_dir is a drive root),
-        # fall back to using start_dir as the root.
-        if os.path.realpath(parent_dir) == os.path.realpath(start_dir):
-            root = start_dir
-        else:
-            root = parent_dir
-    ensure_within_root(start_path, root)
 
-    files, name_to_path, name_to_all_paths = discover_closure(
-        start_path, root, args.exts)
+def _write_csv(csv_path: str, header: List[str], rows: List[list]) -> None:
+    try:
+        import csv
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(header)
+            w.writerows(rows)
+        print(f"\nCSV written to: {os.path.abspath(csv_path)}")
+    except Exception as e:
+        print(f"[WARN] Failed to write CSV: {e}", file=sys.stderr)
 
-    print("# Discovered files (deduped by basename, search confined to root):")
+
+def _report_single(discovery: IncludeDiscovery, files: List[str], args,
+                   title: str = "Discovered files (deduped by basename, search confined to root)") -> None:
+    print(f"# {title}:")
     for p in files:
         print(p)
 
@@ -340,8 +688,7 @@ def main():
     total = 0
     per_file: List[Tuple[str, int]] = []
     for p in files:
-        loc = count_non_comment_lines(
-            p, exclude_blank=(not args.include_blanks))
+        loc = discovery.loc(p, exclude_blank=(not args.include_blanks))
         per_file.append((p, loc))
         total += loc
         print(f"{loc:8d}  {p}")
@@ -349,16 +696,359 @@ def main():
     print("\n# TOTAL LOC:", total)
 
     if args.csv:
-        try:
-            import csv
-            with open(args.csv, "w", newline="", encoding="utf-8") as f:
-                w = csv.writer(f)
-                w.writerow(["file", "loc"])
-                w.writerows(per_file)
-                w.writerow(["TOTAL", total])
+        _write_csv(args.csv, ["file", "loc"], per_file + [["TOTAL", total]])
+
+
+def _report_batch(discovery: IncludeDiscovery, closures: List[Tuple[str, List[str]]], args) -> None:
+    """Per translation unit closures, then the union deduped by basename."""
+    exclude_blank = not args.include_blanks
+    rows: List[list] = []
+    tu_sum = 0
+    unique: Dict[str, str] = {}  # basename -> first path seen over all TUs
+
+    for start_path, files in closures:
+        print(f"# Translation unit: {start_path}")
+        tu_total = 0
+        for p in files:
+            unique.setdefault(os.path.basename(p), p)
+            if args.list_only:
+                print(p)
+                continue
+            loc = discovery.loc(p, exclude_blank)
+            tu_total += loc
+            rows.append([start_path, p, loc])
+            print(f"{loc:8d}  {p}")
+        if not args.list_only:
+            tu_sum += tu_total
+            rows.append([start_path, "TOTAL", tu_total])
+            print(f"# TU TOTAL LOC: {tu_total}  ({len(files)} files)")
+        print()
+
+    print(f"# Unique files over {len(closures)} translation units "
+          "(deduped by basename, search confined to root):")
+    if args.list_only:
+        for p in unique.values():
+            print(p)
+        return
+
+    grand_total = 0
+    for p in unique.values():
+        loc = discovery.loc(p, exclude_blank)
+        grand_total += loc
+        print(f"{loc:8d}  {p}")
+    print("\n# SUM OF TU TOTALS:", tu_sum)
+    print("# TOTAL LOC (deduplicated):", grand_total)
+
+    if args.csv:
+        rows.append(["ALL", "TOTAL (deduplicated)", grand_total])
+        _write_csv(args.csv, ["translation_unit", "file", "loc"], rows)
+
+
+def _report_stream(discovery: IncludeDiscovery, start_paths: List[str], batch: bool, args) -> None:
+    """
+    Print (and write to CSV) each file's LOC as soon as it is counted.
+    Scans are dropped once counted (except a small LRU for headers shared by
+    later translation units), so only basenames and per-basename LOC (for the
+    deduplicated batch total) are kept while the closure grows.
+    """
+    exclude_blank = not args.include_blanks
+    csv_file = None
+    writer = None
+    if args.csv and not args.list_only:
+        import csv
+        csv_file = open(args.csv, "w", newline="", encoding="utf-8")
+        writer = csv.writer(csv_file)
+        writer.writerow(["translation_unit", "file", "loc"] if batch else ["file", "loc"])
+
+    unique_loc: Dict[str, int] = {}  # basename -> LOC of the first path seen
+    tu_sum = 0
+    try:
+        for start_path in start_paths:
+            if batch:
+                print(f"# Translation unit: {start_path}")
+            elif not args.list_only:
+                print("# LOC per file (non-comment lines{}, streamed):".format(
+                    "" if args.include_blanks else ", blanks excluded"))
+            tu_total = 0
+            files = 0
+            for p, scan in discovery.iter_closure(start_path, keep=False):
+                files += 1
+                if args.list_only:
+                    print(p, flush=True)
+                    continue
+                loc = discovery.scan_loc(p, scan, exclude_blank)
+                unique_loc.setdefault(os.path.basename(p), loc)
+                tu_total += loc
+                print(f"{loc:8d}  {p}", flush=True)
+                if writer is not None:
+                    writer.writerow([start_path, p, loc] if batch else [p, loc])
+            if args.list_only:
+                continue
+            tu_sum += tu_total
+            if batch:
+                print(f"# TU TOTAL LOC: {tu_total}  ({files} files)\n")
+                if writer is not None:
+                    writer.writerow([start_path, "TOTAL", tu_total])
+            else:
+                print("\n# TOTAL LOC:", tu_total)
+                if writer is not None:
+                    writer.writerow(["TOTAL", tu_total])
+
+        if batch and not args.list_only:
+            print("# SUM OF TU TOTALS:", tu_sum)
+            print("# TOTAL LOC (deduplicated):", sum(unique_loc.values()))
+            if writer is not None:
+                writer.writerow(["ALL", "TOTAL (deduplicated)", sum(unique_loc.values())])
+    finally:
+        if csv_file is not None:
+            csv_file.close()
             print(f"\nCSV written to: {os.path.abspath(args.csv)}")
-        except Exception as e:
-            print(f"[WARN] Failed to write CSV: {e}", file=sys.stderr)
+
+
+def _print_history(rows, fmt: str) -> None:
+    """Write history rows to stdout as CSV or NDJSON, one line per commit as it is computed."""
+    import csv
+    import json
+    fields = ["commit", "date", "files", "loc", "delta", "changed"]
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(sys.stdout, fieldnames=fields, lineterminator="\n")
+        writer.writeheader()
+    for row in rows:
+        if writer is not None:
+            writer.writerow(row)
+        else:
+            print(json.dumps(row))
+        sys.stdout.flush()
+
+
+def _main_git(args) -> None:
+    """--rev / --diff / --history: count from git objects instead of the working tree."""
+    import subprocess
+    from analyzer.git_rev_loc import (
+        BlobScanner, GitCatFile, GitRevDiscovery,
+        diff_rev_locs, git_toplevel, loc_history, parse_range, print_rev_diff)
+
+    # git_toplevel returns a real path and tree paths are joined to it, so the root
+    # and start files are compared as real paths too (a checkout may be reached via a symlink)
+    start_paths = [os.path.realpath(p) for p in args.start]
+    base = args.root or (os.path.dirname(start_paths[0]) if start_paths else os.getcwd())
+    try:
+        repo = git_toplevel(os.path.abspath(base))
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"[ERROR] Not inside a git work tree: {base} ({e})", file=sys.stderr)
+        sys.exit(1)
+    if args.root:
+        root = os.path.realpath(args.root)
+    elif start_paths:
+        root = _default_root(start_paths)
+    else:
+        root = repo
+    for start_path in start_paths:
+        ensure_within_root(start_path, root)
+
+    exclude_blank = not args.include_blanks
+    cache = LocCache(args.cache) if args.cache else None
+    try:
+        with GitCatFile(repo) as cat_file:
+            blob_scanner = BlobScanner(cat_file, cache)
+            if args.history:
+                _print_history(loc_history(repo, args.history, root, args.exts,
+                                           blob_scanner, exclude_blank),
+                               args.history_format)
+                print(f"[INFO] History: {blob_scanner.blobs_read} blobs read",
+                      file=sys.stderr)
+                return
+            if args.diff:
+                rev_a, rev_b = parse_range(args.diff)
+                rows = diff_rev_locs(repo, rev_a, rev_b, root, args.exts, blob_scanner,
+                                     exclude_blank)
+                print_rev_diff(args.diff, rows, exclude_blank)
+                if args.csv:
+                    _write_csv(args.csv, ["status", "file", "loc_a", "loc_b", "delta"],
+                               [[st, p, a, b, b - a] for st, p, a, b in rows])
+                return
+
+            discovery = GitRevDiscovery(repo, args.rev, root, args.exts, blob_scanner)
+            if not start_paths:
+                files = discovery.code_files()
+                discovery.scan_many(files)
+                _report_single(discovery, files, args,
+                               title=f"Files at {args.rev} (search confined to root)")
+                return
+            closures = [(p, discovery.closure(p)) for p in start_paths]
+            if len(closures) > 1:
+                _report_batch(discovery, closures, args)
+            else:
+                _report_single(discovery, closures[0][1], args)
+            if args.graph_report is not None:
+                print_graph_report(IncludeGraph(discovery, closures, exclude_blank),
+                                   args.graph_report)
+    except (subprocess.CalledProcessError, KeyError, ValueError) as e:
+        detail = e.stderr.decode(errors="ignore").strip() if getattr(e, "stderr", None) else e
+        print(f"[ERROR] {detail}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if cache is not None:
+            cache.save()
+            print(f"[INFO] Cache {cache.cache_path}: {cache.hits} hits, {cache.misses} misses",
+                  file=sys.stderr)
+
+
+def _main_tree(args) -> None:
+    """Count closures of start files in the working tree (the default mode)."""
+    if args.stream and args.graph_report is not None:
+        print("[ERROR] --graph-report needs the whole include graph in memory; "
+              "it cannot be combined with --stream.", file=sys.stderr)
+        sys.exit(2)
+
+    profiler = PhaseProfiler() if (args.profile or args.profile_ndjson) else None
+    start_paths = _collect_start_paths(args)
+    batch = len(start_paths) > 1 or bool(args.glob)
+
+    root = os.path.abspath(args.root) if args.root else _default_root(start_paths)
+    for start_path in start_paths:
+        ensure_within_root(start_path, root)
+
+    cache = LocCache(args.cache) if args.cache else None
+    executor = create_executor(args.jobs)
+    try:
+        discovery = IncludeDiscovery(root, args.exts, executor=executor, jobs=args.jobs,
+                                     cache=cache,
+                                     walker=args.walker, prune=args.prune,
+                                     compact=(args.compact_index or args.stream),
+                                     profiler=profiler)
+        if args.stream:
+            _report_stream(discovery, start_paths, batch, args)
+        else:
+            closures = [(p, discovery.closure(p)) for p in start_paths]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if cache is not None:
+            cache.save()
+            print(f"[INFO] Cache {cache.cache_path}: {cache.hits} hits, {cache.misses} misses",
+                  file=sys.stderr)
+    lookups = discovery.resolve_hits + discovery.resolve_misses
+    if args.profile and lookups:
+        print(f"[INFO] Include resolution: {lookups} lookups, {discovery.resolve_hits} cached "
+              f"({100.0 * discovery.resolve_hits / lookups:.1f}% hit rate)", file=sys.stderr)
+
+    if not args.stream:
+        # Every discovered file was scanned once during discovery
+        if batch:
+            _report_batch(discovery, closures, args)
+        else:
+            _report_single(discovery, closures[0][1], args)
+
+        if args.graph_report is not None:
+            graph = IncludeGraph(discovery, closures,
+                                 exclude_blank=(not args.include_blanks))
+            print_graph_report(graph, args.graph_report)
+
+    if profiler is not None:
+        if args.profile:
+            profiler.report()
+        if args.profile_ndjson:
+            profiler.append_ndjson(args.profile_ndjson, {
+                "root": root, "start_files": len(start_paths), "jobs": args.jobs,
+                "walker": args.walker, "cache": bool(cache), "stream": args.stream})
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description=(
+            "Count non-comment LOC for a C/C++ source file and its local #includes "
+            "(within the same directory tree). If no start file is provided, a "
+            "file selection dialog will open."
+        ))
+    ap.add_argument("start", nargs="*", default=[],
+                    help="Path(s) to the starting C/C++ file(s). If omitted, a GUI file chooser opens. "
+                         "With several start files, each is reported as a translation unit.")
+    ap.add_argument("--glob", action="append", default=None,
+                    help="Add start files matching this glob pattern ('**' allowed); repeatable.")
+    ap.add_argument(
+        "--root", help="Restrict search to this root (default: directory of start file).", default=None)
+    ap.add_argument("--exts", nargs="*", default=DEFAULT_EXTS,
+                    help=f"File extensions considered as code (default: {DEFAULT_EXTS})")
+    ap.add_argument("--include-blanks", action="store_true",
+                    help="Count blank-only lines as code (default: exclude blanks).")
+    ap.add_argument(
+        "--csv", help="Optional path to write a CSV report (file,loc).")
+    ap.add_argument("--list-only", action="store_true",
+                    help="Only list discovered files (no counting).")
+    ap.add_argument("--jobs", type=int, default=1,
+                    help="Worker processes for include parsing and counting "
+                         "(default: 1 = serial, 0 = one per CPU).")
+    ap.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_PATH, default=None,
+                    help="Reuse include lists and LOC of unchanged files from this cache file "
+                         f"(default when given without a path: {DEFAULT_CACHE_PATH}).")
+    ap.add_argument("--walker", choices=WALKERS, default="os-walk",
+                    help="How to enumerate files under root: os-walk (everything), "
+                         "scandir (skips --prune directories) or git (git ls-files, "
+                         "honours .gitignore). Default: os-walk.")
+    ap.add_argument("--prune", nargs="*", default=None,
+                    help=f"Directory name patterns skipped by the scandir walker (default: {DEFAULT_PRUNE}).")
+    ap.add_argument("--graph-report", nargs="?", type=int, const=20, default=None, metavar="N",
+                    help="Also report closure size per translation unit, header fan-in and the "
+                         "heaviest include edges (top N rows, default 20).")
+    ap.add_argument("--compact-index", action="store_true",
+                    help="Store the basename index as directory IDs plus file names "
+                         "instead of full paths (less memory on very large roots).")
+    ap.add_argument("--stream", action="store_true",
+                    help="Print each file's LOC as soon as it is counted and drop its scan "
+                         f"(the last {STREAM_SCAN_LRU_SIZE} are kept for reuse by later "
+                         "translation units), so memory does not grow with the closures "
+                         "(implies --compact-index). The basename index still grows with "
+                         "the number of files under root.")
+    ap.add_argument("--profile", action="store_true",
+                    help="Report wall time, files, bytes and throughput per phase "
+                         "(index, scan, resolve, count) and the include-resolution "
+                         "hit rate on stderr.")
+    ap.add_argument("--profile-ndjson", default=None, metavar="FILE",
+                    help="Append one JSON line with the phase timings of this run to FILE.")
+    ap.add_argument("--cprofile", default=None, metavar="FILE",
+                    help="Write cProfile stats of the run to FILE (worker processes of "
+                         "--jobs are not included; view with python -m pstats FILE).")
+    ap.add_argument("--rev", default=None,
+                    help="Count at this git revision (read via git cat-file, no checkout). "
+                         "Without start files, every code file under root is counted.")
+    ap.add_argument("--diff", default=None, metavar="A..B",
+                    help="Report per-file LOC changes of code files under root between two revisions "
+                         "(only the files changed between them are read).")
+    ap.add_argument("--history", default=None, metavar="RANGE",
+                    help="Print the LOC of code files under root for every commit of RANGE "
+                         "(e.g. v1.0..main, first-parent chain), reusing results per blob SHA.")
+    ap.add_argument("--history-format", choices=["csv", "ndjson"], default="csv",
+                    help="Output format of --history (default: csv).")
+    args = ap.parse_args()
+
+    git_mode = bool(args.rev or args.diff or args.history)
+    if git_mode:
+        # Options of the working-tree mode only (the profile phases are index, scan,
+        # resolve, count); the git modes read one cat-file stream, serially
+        tree_only = [("--profile", args.profile), ("--profile-ndjson", args.profile_ndjson),
+                     ("--jobs", args.jobs != 1), ("--walker", args.walker != "os-walk"),
+                     ("--prune", args.prune is not None), ("--glob", bool(args.glob)),
+                     ("--stream", args.stream), ("--compact-index", args.compact_index)]
+        given = [name for name, used in tree_only if used]
+        if given:
+            ap.error(f"{', '.join(given)} cannot be combined with --rev, --diff or --history.")
+    run = _main_git if git_mode else _main_tree
+
+    if args.cprofile:
+        import cProfile
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            run(args)
+        finally:
+            profile.disable()
+            profile.dump_stats(args.cprofile)
+            print(f"[INFO] cProfile stats written to: {os.path.abspath(args.cprofile)}",
+                  file=sys.stderr)
+    else:
+        run(args)
 
 
 if __name__ == "__main__":
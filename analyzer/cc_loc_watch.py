@@ -0,0 +1,418 @@
+"""
+File: cc_loc_watch.py
+
+Watch daemon for cc_loc_counter with a warm in-memory include graph.
+
+- 'serve' builds the basename index (name_to_path, name_to_all_paths) of a
+  root once and keeps it, together with every file's scan and resolved
+  includes, in memory (an IncludeDiscovery).
+- File create / modify / delete events are applied incrementally:
+    * Linux: inotify (through ctypes, no extra packages).
+    * Elsewhere, or with --poll: a polling fallback comparing mtimes and sizes.
+  A modified file only loses its own scan. A created or deleted file updates
+  the index and drops the memoized include resolutions, which are cheap to
+  redo; scans of unchanged files are kept.
+- The same --prune patterns (default: DEFAULT_PRUNE) are skipped when indexing
+  (scandir walker, the default) and when watching.
+- Queries "closure and LOC for file X" are answered over a local socket
+  (a Unix domain socket, or TCP on 127.0.0.1 with --port), one JSON object
+  per line in each direction.
+
+Usage:
+        python cc_loc_watch.py serve --root /path/to/root [--socket PATH | --port N] [--poll]
+        python cc_loc_watch.py query path/to/file.cpp --root /path/to/root [--include-blanks]
+
+Query protocol (newline-delimited JSON):
+        -> {"path": "/abs/file.cpp", "include_blanks": false}
+        <- {"ok": true, "files": [...], "loc": [...], "total": 123, "ms": 0.8}
+        -> {"cmd": "stats"}
+        <- {"ok": true, "files_indexed": ..., "files_scanned": ..., "events": ...}
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from analyzer.cc_loc_counter import DEFAULT_EXTS, IncludeDiscovery, is_code_like
+from analyzer.file_enumeration import DEFAULT_PRUNE, WALKERS, iter_files, _is_pruned
+
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+def default_socket_path(root: str) -> str:
+    """Per-root socket path, so several roots can be served at once."""
+    digest = hashlib.sha1(os.path.abspath(root).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"cc_loc_watch-{digest}.sock")
+
+
+class WatchState:
+    """IncludeDiscovery kept warm and updated from file events (thread-safe)."""
+
+    def __init__(self, root: str, exts: List[str], walker: str = "scandir",
+                 prune: Optional[List[str]] = None):
+        self.root = root
+        self.exts = exts
+        self.walker = walker
+        self.prune = DEFAULT_PRUNE if prune is None else prune
+        # Directories inotify does not watch: the ones the scandir index skips.
+        # os-walk indexes every directory, so every directory is watched.
+        self.watch_prune = [] if walker == "os-walk" else self.prune
+        self.lock = threading.Lock()
+        self.events = 0
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        with self.lock:
+            self.discovery = IncludeDiscovery(self.root, self.exts,
+                                              walker=self.walker, prune=self.prune)
+
+    def _forget_scan(self, path: str) -> None:
+        for p in {path, os.path.realpath(path)}:
+            self.discovery.scans.pop(p, None)
+            self.discovery.resolved.pop(p, None)
+
+    def file_modified(self, path: str) -> None:
+        with self.lock:
+            self.events += 1
+            self._forget_scan(path)
+
+    def file_created(self, path: str) -> None:
+        with self.lock:
+            self.events += 1
+            self._forget_scan(path)
+            bn = os.path.basename(path)
+            if not is_code_like(bn, self.exts):
+                return
+            # New files can make relative or basename includes resolvable
+            self.discovery.invalidate_resolution()
+            all_paths = self.discovery.name_to_all_paths.setdefault(bn, [])
+            if path not in all_paths:
+                all_paths.append(path)
+            self.discovery.name_to_path.setdefault(bn, path)
+
+    def file_deleted(self, path: str) -> None:
+        with self.lock:
+            self.events += 1
+            self._forget_scan(path)
+            self.discovery.invalidate_resolution()
+            bn = os.path.basename(path)
+            all_paths = self.discovery.name_to_all_paths.get(bn)
+            if not all_paths or path not in all_paths:
+                return
+            all_paths.remove(path)
+            if self.discovery.name_to_path.get(bn) == path:
+                # Fall back to the next path discovered for this basename
+                if all_paths:
+                    self.discovery.name_to_path[bn] = all_paths[0]
+                else:
+                    del self.discovery.name_to_path[bn]
+                    del self.discovery.name_to_all_paths[bn]
+
+    def dir_deleted(self, dir_path: str) -> None:
+        prefix = dir_path.rstrip(os.sep) + os.sep
+        with self.lock:
+            indexed = [p for paths in self.discovery.name_to_all_paths.values()
+                       for p in paths if p.startswith(prefix)]
+        for p in indexed:
+            self.file_deleted(p)
+
+    def query(self, path: str, exclude_blank: bool = True) -> dict:
+        t0 = time.perf_counter()
+        path = os.path.abspath(path)
+        if not is_code_like(path, self.exts):
+            return {"ok": False, "error": f"not a C/C++ file: {path}"}
+        # Checked before discovery, which would add the path to the index
+        if not os.path.isfile(path):
+            return {"ok": False, "error": f"no such file: {path}"}
+        root_real = os.path.realpath(self.root)
+        if os.path.commonpath([os.path.realpath(path), root_real]) != root_real:
+            return {"ok": False, "error": f"not under the served root {self.root}: {path}"}
+        with self.lock:
+            files = self.discovery.closure(path)
+            locs = [self.discovery.loc(p, exclude_blank) for p in files]
+        return {"ok": True, "files": files, "loc": locs, "total": sum(locs),
+                "ms": round((time.perf_counter() - t0) * 1000.0, 3)}
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"ok": True, "root": self.root,
+                    "files_indexed": sum(len(v) for v in self.discovery.name_to_all_paths.values()),
+                    "files_scanned": len(self.discovery.scans),
+                    "events": self.events}
+
+
+class PollingWatcher:
+    """Detects changes by comparing (mtime, size) snapshots of the files under root."""
+
+    def __init__(self, state: WatchState, interval: float = DEFAULT_POLL_INTERVAL):
+        self.state = state
+        self.interval = interval
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for p in iter_files(self.state.root, self.state.walker, self.state.prune):
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            snapshot[p] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def run(self) -> None:
+        previous = self._snapshot()
+        while True:
+            time.sleep(self.interval)
+            current = self._snapshot()
+            for p in previous.keys() - current.keys():
+                self.state.file_deleted(p)
+            for p, stamp in current.items():
+                old = previous.get(p)
+                if old is None:
+                    self.state.file_created(p)
+                elif old != stamp:
+                    self.state.file_modified(p)
+            previous = current
+
+
+class InotifyWatcher:
+    """Linux inotify watcher over every (non-pruned) directory under root."""
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, state: WatchState):
+        import ctypes
+        import ctypes.util
+
+        self.state = state
+        self.prune = state.watch_prune
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init()
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init failed")
+        self.wd_to_dir: Dict[int, str] = {}
+        self._watch_tree(state.root)
+
+    def _watch_tree(self, top: str) -> None:
+        import ctypes
+
+        stack = [top]
+        while stack:
+            d = stack.pop()
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(d), self.MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                print(f"[WARN] Cannot watch {d}: {os.strerror(err)}", file=sys.stderr)
+                continue
+            self.wd_to_dir[wd] = d
+            try:
+                with os.scandir(d) as it:
+                    for entry in it:
+                        if (entry.is_dir(follow_symlinks=False)
+                                and not _is_pruned(entry.name, self.prune)):
+                            stack.append(entry.path)
+            except OSError:
+                pass
+
+    def _dir_created(self, path: str) -> None:
+        self._watch_tree(path)
+        for p in iter_files(path, "scandir", self.prune):
+            self.state.file_created(p)
+
+    def run(self) -> None:
+        header_size = self.EVENT_HEADER.size
+        while True:
+            buf = os.read(self.fd, 64 * 1024)
+            offset = 0
+            while offset + header_size <= len(buf):
+                wd, mask, _, name_len = self.EVENT_HEADER.unpack_from(buf, offset)
+                name = buf[offset + header_size:offset + header_size + name_len].rstrip(b"\0")
+                offset += header_size + name_len
+
+                if mask & self.IN_Q_OVERFLOW:
+                    # Events were lost: start over from the file system
+                    self.state.rebuild()
+                    continue
+                if mask & self.IN_IGNORED:
+                    self.wd_to_dir.pop(wd, None)
+                    continue
+                base = self.wd_to_dir.get(wd)
+                if base is None or not name:
+                    continue
+                path = os.path.join(base, os.fsdecode(name))
+
+                if mask & self.IN_ISDIR:
+                    if _is_pruned(os.path.basename(path), self.prune):
+                        continue
+                    if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                        self._dir_created(path)
+                    elif mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+                        self.state.dir_deleted(path)
+                elif mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    self.state.file_created(path)
+                elif mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+                    self.state.file_deleted(path)
+                elif mask & (self.IN_MODIFY | self.IN_CLOSE_WRITE):
+                    self.state.file_modified(path)
+
+
+class _QueryHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        state: WatchState = self.server.state
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if request.get("cmd") == "stats":
+                    response = state.stats()
+                else:
+                    response = state.query(request["path"],
+                                           exclude_blank=not request.get("include_blanks", False))
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+def _make_server(socket_path: Optional[str], port: Optional[int]) -> socketserver.BaseServer:
+    if port is not None or not hasattr(socketserver, "ThreadingUnixStreamServer"):
+        server = socketserver.ThreadingTCPServer(("127.0.0.1", port or 0), _QueryHandler)
+    else:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = socketserver.ThreadingUnixStreamServer(socket_path, _QueryHandler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(args) -> None:
+    root = os.path.abspath(args.root)
+    t0 = time.perf_counter()
+    state = WatchState(root, args.exts, walker=args.walker, prune=args.prune)
+    print(f"[INFO] Indexed {state.stats()['files_indexed']} files under {root} "
+          f"in {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+
+    watcher = None
+    if not args.poll and sys.platform.startswith("linux"):
+        try:
+            watcher = InotifyWatcher(state)
+        except OSError as e:
+            print(f"[WARN] inotify unavailable ({e}); polling instead.", file=sys.stderr)
+    if watcher is None:
+        watcher = PollingWatcher(state, args.poll_interval)
+    threading.Thread(target=watcher.run, daemon=True).start()
+
+    socket_path = args.socket or default_socket_path(root)
+    server = _make_server(socket_path, args.port)
+    server.state = state
+    address = server.server_address
+    print(f"[INFO] Serving {type(watcher).__name__} state on "
+          f"{address if isinstance(address, str) else '%s:%d' % address}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if isinstance(address, str) and os.path.exists(address):
+            os.remove(address)
+
+
+def send_request(request: dict, socket_path: Optional[str] = None,
+                 port: Optional[int] = None, timeout: float = 30.0) -> dict:
+    """Send one request to a running daemon and return its response."""
+    if port is not None:
+        sock = socket.create_connection(("127.0.0.1", port), timeout=timeout)
+    else:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+    with sock, sock.makefile("rwb") as f:
+        f.write(json.dumps(request).encode("utf-8") + b"\n")
+        f.flush()
+        return json.loads(f.readline())
+
+
+def query(args) -> None:
+    socket_path = args.socket or (default_socket_path(args.root) if args.root else None)
+    if socket_path is None and args.port is None:
+        print("[ERROR] Give --root, --socket or --port to find the daemon.", file=sys.stderr)
+        sys.exit(2)
+    if args.file == "stats":
+        request = {"cmd": "stats"}
+    else:
+        request = {"path": os.path.abspath(args.file), "include_blanks": args.include_blanks}
+    response = send_request(request, socket_path, args.port)
+    if not response.get("ok"):
+        print(f"[ERROR] {response.get('error')}", file=sys.stderr)
+        sys.exit(1)
+    if "files" not in response:
+        print(json.dumps(response, indent=2))
+        return
+    for p, loc in zip(response["files"], response["loc"]):
+        print(f"{loc:8d}  {p}")
+    print(f"\n# TOTAL LOC: {response['total']}  ({response['ms']} ms)")
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Keep cc_loc_counter's include graph warm and answer closure/LOC queries.")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    ap_serve = sub.add_parser("serve", help="Run the watch daemon.")
+    ap_serve.add_argument("--root", required=True, help="Directory tree to index and watch.")
+    ap_serve.add_argument("--exts", nargs="*", default=DEFAULT_EXTS,
+                          help=f"File extensions considered as code (default: {DEFAULT_EXTS})")
+    ap_serve.add_argument("--walker", choices=WALKERS, default="scandir",
+                          help="File enumeration backend for the initial index (default: scandir). "
+                               "Directories skipped while indexing are not watched; os-walk "
+                               "indexes and watches every directory.")
+    ap_serve.add_argument("--prune", nargs="*", default=None,
+                          help=f"Directory name patterns neither indexed nor watched "
+                               f"(default: {DEFAULT_PRUNE}).")
+    ap_serve.add_argument("--poll", action="store_true",
+                          help="Use the polling watcher even where inotify is available.")
+    ap_serve.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                          help=f"Seconds between polls (default: {DEFAULT_POLL_INTERVAL}).")
+
+    ap_query = sub.add_parser("query", help="Ask a running daemon for a file's closure and LOC.")
+    ap_query.add_argument("file", help="C/C++ file to query, or 'stats'.")
+    ap_query.add_argument("--root", help="Root the daemon serves (to find its default socket).")
+    ap_query.add_argument("--include-blanks", action="store_true",
+                          help="Count blank-only lines as code (default: exclude blanks).")
+
+    for p in (ap_serve, ap_query):
+        p.add_argument("--socket", default=None,
+                       help="Unix socket path (default: per-root path in the temp directory).")
+        p.add_argument("--port", type=int, default=None,
+                       help="Use TCP on 127.0.0.1:PORT instead of a Unix socket.")
+
+    args = ap.parse_args()
+    if args.command == "serve":
+        serve(args)
+    else:
+        query(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+File: compact_index.py
+
+Compact basename index for cc_loc_counter (--compact-index / --stream).
+
+build_index keeps every path twice as a full string (name_to_path and
+name_to_all_paths). On a workspace with all repositories and submodules
+checked out that is hundreds of thousands of strings. CompactIndex stores
+each directory string once and each file as a directory ID under its
+basename, which is also the file name, so no full path is kept.
+
+FirstPathView and AllPathsView are read-only mappings with the same
+interface as name_to_path and name_to_all_paths; paths are rebuilt on access.
+"""
+from __future__ import annotations
+import os
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Union
+
+
+class CompactIndex:
+    """basename -> paths, each path stored as a directory ID."""
+
+    def __init__(self):
+        self.dirs: List[str] = []
+        self.dir_ids: Dict[str, int] = {}
+        # basename -> directory ID, or list of IDs in discovery order for duplicates
+        self.entries: Dict[str, Union[int, List[int]]] = {}
+
+    def add(self, path: str) -> None:
+        dirname, bn = os.path.split(path)
+        dir_id = self.dir_ids.get(dirname)
+        if dir_id is None:
+            dir_id = len(self.dirs)
+            self.dirs.append(dirname)
+            self.dir_ids[dirname] = dir_id
+        current = self.entries.get(bn)
+        if current is None:
+            self.entries[bn] = dir_id
+        elif isinstance(current, int):
+            self.entries[bn] = [current, dir_id]
+        else:
+            current.append(dir_id)
+
+    def first(self, bn: str) -> Optional[str]:
+        current = self.entries.get(bn)
+        if current is None:
+            return None
+        dir_id = current if isinstance(current, int) else current[0]
+        return os.path.join(self.dirs[dir_id], bn)
+
+    def all(self, bn: str) -> List[str]:
+        current = self.entries.get(bn)
+        if current is None:
+            return []
+        ids = [current] if isinstance(current, int) else current
+        return [os.path.join(self.dirs[i], bn) for i in ids]
+
+
+class FirstPathView(Mapping):
+    """name_to_path over a CompactIndex."""
+
+    def __init__(self, index: CompactIndex):
+        self.index = index
+
+    def __getitem__(self, bn: str) -> str:
+        path = self.index.first(bn)
+        if path is None:
+            raise KeyError(bn)
+        return path
+
+    def __contains__(self, bn) -> bool:
+        return bn in self.index.entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.index.entries)
+
+    def __len__(self) -> int:
+        return len(self.index.entries)
+
+
+class AllPathsView(Mapping):
+    """name_to_all_paths over a CompactIndex (lists are rebuilt on each access)."""
+
+    def __init__(self, index: CompactIndex):
+        self.index = index
+
+    def __getitem__(self, bn: str) -> List[str]:
+        if bn not in self.index.entries:
+            raise KeyError(bn)
+        return self.index.all(bn)
+
+    def __contains__(self, bn) -> bool:
+        return bn in self.index.entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.index.entries)
+
+    def __len__(self) -> int:
+        return len(self.index.entries)
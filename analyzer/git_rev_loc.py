@@ -0,0 +1,300 @@
+"""
+File: git_rev_loc.py
+
+Git-revision support for cc_loc_counter (--rev / --diff / --history).
+
+Counts LOC at any commit without a checkout:
+  - Files are enumerated with 'git ls-tree -r -z <rev>'.
+  - Contents are read through ONE long-lived 'git cat-file --batch' process,
+    so there is no per-file subprocess.
+  - Scan results are memoized by blob SHA (and persisted in the LocCache when
+    --cache is given), so a blob shared by several revisions is scanned once.
+
+diff_rev_locs (--diff) reads only the blobs 'git diff-tree' reports as
+changed between the two revisions. loc_history walks the first-parent chain
+of a commit range and diffs each commit against the previous one, so only
+changed blobs are looked up and blobs seen before are never scanned again.
+
+Includes are resolved with the same rules as on the working tree, against the
+paths that exist in the tree at that revision. Submodules (gitlinks) and
+symlinks in the tree are not followed.
+"""
+from __future__ import annotations
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from analyzer.buffer_scanner import scan_buffer
+from analyzer.cc_loc_counter import IncludeDiscovery, is_code_like, scan_loc
+from analyzer.loc_cache import LocCache
+
+BLOB_MODES = ("100644", "100755")
+
+
+def git_toplevel(path: str) -> str:
+    """Top-level directory (real path) of the work tree containing path."""
+    if not os.path.isdir(path):
+        path = os.path.dirname(path)
+    result = subprocess.run(["git", "-C", path, "rev-parse", "--show-toplevel"],
+                            capture_output=True, text=True, check=True)
+    return os.path.realpath(result.stdout.strip())
+
+
+def ls_tree(repo: str, rev: str) -> Dict[str, str]:
+    """Return {repo-relative posix path: blob SHA} for regular files at rev."""
+    result = subprocess.run(["git", "-C", repo, "ls-tree", "-r", "-z", rev],
+                            capture_output=True, check=True)
+    tree: Dict[str, str] = {}
+    for record in result.stdout.split(b"\0"):
+        if not record:
+            continue
+        info, rel = record.split(b"\t", 1)
+        mode, obj_type, sha = info.decode().split(" ")
+        if obj_type == "blob" and mode in BLOB_MODES:
+            tree[os.fsdecode(rel)] = sha
+    return tree
+
+
+class GitCatFile:
+    """A single 'git cat-file --batch' process serving object reads."""
+
+    def __init__(self, repo: str):
+        self.proc = subprocess.Popen(
+            ["git", "-C", repo, "cat-file", "--batch"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def read(self, sha: str) -> bytes:
+        self.proc.stdin.write(sha.encode() + b"\n")
+        self.proc.stdin.flush()
+        header = self.proc.stdout.readline().split()
+        if len(header) != 3:
+            raise KeyError(f"git object not found: {sha}")
+        size = int(header[2])
+        data = self.proc.stdout.read(size)
+        self.proc.stdout.read(1)  # trailing newline
+        return data
+
+    def close(self) -> None:
+        if self.proc.poll() is None:
+            self.proc.stdin.close()
+            self.proc.wait()
+            self.proc.stdout.close()
+
+    def __enter__(self) -> "GitCatFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class BlobScanner:
+    """scan_file results by blob SHA, shared by every revision of one repository."""
+
+    def __init__(self, cat_file: GitCatFile, cache: Optional[LocCache] = None):
+        self.cat_file = cat_file
+        self.cache = cache
+        self.scans: Dict[str, Tuple[List[str], int, int]] = {}
+        self.blobs_read = 0
+
+    def scan(self, sha: str) -> Tuple[List[str], int, int]:
+        scan = self.scans.get(sha)
+        if scan is None and self.cache is not None:
+            scan = self.cache.get_blob(sha, "scan")
+        if scan is None:
+            scan = scan_buffer(self.cat_file.read(sha))
+            self.blobs_read += 1
+            if self.cache is not None:
+                self.cache.put_blob(sha, "scan", scan)
+        self.scans[sha] = scan
+        return scan
+
+
+class GitRevDiscovery(IncludeDiscovery):
+    """
+    IncludeDiscovery over the tree of a revision instead of the working tree.
+    Paths are reported as they would appear in a checkout of repo.
+    """
+
+    def __init__(self, repo: str, rev: str, root: str, exts: List[str],
+                 blob_scanner: BlobScanner):
+        self.repo = repo
+        self.rev = rev
+        self.blob_scanner = blob_scanner
+
+        # path -> blob SHA of every file under root at rev
+        self.blob_of: Dict[str, str] = {}
+        name_to_path: Dict[str, str] = {}
+        name_to_all_paths: Dict[str, List[str]] = {}
+        root_prefix = root.rstrip(os.sep) + os.sep
+        for rel, sha in ls_tree(repo, rev).items():
+            p = os.path.join(repo, rel.replace("/", os.sep))
+            if not (p.startswith(root_prefix) or p == root):
+                continue
+            self.blob_of[p] = sha
+            bn = os.path.basename(p)
+            if is_code_like(bn, exts):
+                if bn not in name_to_path:
+                    name_to_path[bn] = p
+                name_to_all_paths.setdefault(bn, []).append(p)
+
+        super().__init__(root, exts, cache=blob_scanner.cache,
+                         name_maps=(name_to_path, name_to_all_paths))
+
+    def add_start(self, start_path: str) -> str:
+        if start_path not in self.blob_of:
+            print(f"[ERROR] Start file not found at {self.rev}: {start_path}", file=sys.stderr)
+            sys.exit(1)
+        return super().add_start(start_path)
+
+    def scan_many(self, paths: List[str]) -> None:
+        for p in paths:
+            if p not in self.scans:
+                self.scans[p] = self.blob_scanner.scan(self.blob_of[p])
+
+    def resolve(self, including_file: str, target: str) -> Optional[str]:
+        # Same strategy as resolve_include, checked against the tree at rev
+        if os.sep in target or "/" in target:
+            target_norm = target.replace("\\", "/")
+            candidate = os.path.normpath(
+                os.path.join(os.path.dirname(including_file), target_norm))
+            if candidate in self.blob_of:
+                return candidate
+        return self.name_to_path.get(os.path.basename(target))
+
+    def code_files(self) -> List[str]:
+        """All code-like files under root at rev, in tree order."""
+        return [p for p in self.blob_of if is_code_like(p, self.exts)]
+
+
+def diff_rev_locs(repo: str, rev_a: str, rev_b: str, root: str, exts: List[str],
+                  blob_scanner: BlobScanner,
+                  exclude_blank: bool = True) -> List[Tuple[str, str, int, int]]:
+    """
+    Per-file changes of code files under root between two revisions as
+    (status, path, loc_a, loc_b), status being A (added), D (deleted) or
+    M (modified). Only the blobs listed by diff_tree are read, so the cost
+    scales with the changed files, not with the size of the tree.
+    """
+    under_root = _root_filter(repo, root)
+
+    def loc_of(mode: str, sha: str) -> Optional[int]:
+        # None: no regular file on this side (absent, symlink or submodule)
+        if mode not in BLOB_MODES:
+            return None
+        return scan_loc(blob_scanner.scan(sha), exclude_blank)
+
+    rows = []
+    for rel, old_mode, old_sha, new_mode, new_sha in diff_tree(repo, rev_a, rev_b):
+        if not (under_root(rel) and is_code_like(rel, exts)):
+            continue
+        if old_sha == new_sha:
+            continue
+        loc_a, loc_b = loc_of(old_mode, old_sha), loc_of(new_mode, new_sha)
+        if loc_a is None and loc_b is None:
+            continue
+        status = "A" if loc_a is None else "D" if loc_b is None else "M"
+        rows.append((status, os.path.join(repo, rel.replace("/", os.sep)),
+                     loc_a or 0, loc_b or 0))
+    return rows
+
+
+def parse_range(rev_range: str) -> Tuple[str, str]:
+    if ".." not in rev_range:
+        raise ValueError(f"Expected a range like A..B, got: {rev_range}")
+    rev_a, rev_b = rev_range.split("..", 1)
+    return rev_a or "HEAD", rev_b or "HEAD"
+
+
+def print_rev_diff(rev_range: str, rows: List[Tuple[str, str, int, int]],
+                   exclude_blank: bool = True) -> None:
+    print("# LOC diff {} (non-comment lines{}):".format(
+        rev_range, ", blanks excluded" if exclude_blank else ""))
+    for status, p, loc_a, loc_b in rows:
+        print(f"{loc_b - loc_a:+8d}  {loc_a:8d} -> {loc_b:8d}  {status}  {p}")
+    total_a = sum(row[2] for row in rows)
+    total_b = sum(row[3] for row in rows)
+    print(f"\n# Changed files: {len(rows)}")
+    print(f"# LOC of changed files: {total_a} -> {total_b} ({total_b - total_a:+d})")
+
+
+def _root_filter(repo: str, root: str):
+    """Predicate on repo-relative posix paths: True if the path lies under root."""
+    root_rel = os.path.relpath(root, repo).replace(os.sep, "/")
+    if root_rel == ".":
+        return lambda rel: True
+    prefix = root_rel + "/"
+    return lambda rel: rel.startswith(prefix)
+
+
+def diff_tree(repo: str, rev_a: str, rev_b: str) -> List[Tuple[str, str, str, str, str]]:
+    """
+    Changed files between two commits as (repo-relative path, old mode,
+    old blob SHA, new mode, new blob SHA); mode "000000" marks a missing side.
+    """
+    result = subprocess.run(
+        ["git", "-C", repo, "diff-tree", "-r", "-z", "--no-renames", rev_a, rev_b],
+        capture_output=True, check=True)
+    parts = result.stdout.split(b"\0")
+    changes = []
+    for i in range(0, len(parts) - 1, 2):
+        meta = parts[i].decode()
+        if not meta.startswith(":"):
+            break
+        old_mode, new_mode, old_sha, new_sha, _ = meta[1:].split(" ")
+        changes.append((os.fsdecode(parts[i + 1]), old_mode, old_sha, new_mode, new_sha))
+    return changes
+
+
+def first_parent_commits(repo: str, rev_range: str) -> List[Tuple[str, str]]:
+    """(commit SHA, committer date ISO 8601) along the first-parent chain, oldest first."""
+    result = subprocess.run(
+        ["git", "-C", repo, "log", "--first-parent", "--reverse",
+         "--format=%H %cI", rev_range],
+        capture_output=True, text=True, check=True)
+    return [tuple(line.split(" ", 1)) for line in result.stdout.splitlines() if line]
+
+
+def loc_history(repo: str, rev_range: str, root: str, exts: List[str],
+                blob_scanner: BlobScanner, exclude_blank: bool = True):
+    """
+    Yield one row per commit of rev_range (first-parent chain, oldest first):
+    {"commit", "date", "files", "loc", "delta", "changed"} for code files under root.
+
+    Only the first commit is listed in full. After that, each commit is diffed
+    against the previous one and only its changed blobs are looked up, so the
+    cost scales with churn. Blobs seen before are never scanned again.
+    """
+    under_root = _root_filter(repo, root)
+
+    def loc_of(sha: str) -> int:
+        return scan_loc(blob_scanner.scan(sha), exclude_blank)
+
+    # repo-relative path -> LOC of the code files under root at the current commit
+    current: Dict[str, int] = {}
+    total = 0
+    previous: Optional[str] = None
+    for commit, date in first_parent_commits(repo, rev_range):
+        before = total
+        if previous is None:
+            for rel, sha in ls_tree(repo, commit).items():
+                if under_root(rel) and is_code_like(rel, exts):
+                    current[rel] = loc_of(sha)
+            total = sum(current.values())
+            changed = len(current)
+        else:
+            changed = 0
+            for rel, _, _, mode, sha in diff_tree(repo, previous, commit):
+                if not (under_root(rel) and is_code_like(rel, exts)):
+                    continue
+                changed += 1
+                total -= current.pop(rel, 0)
+                if mode in BLOB_MODES:
+                    current[rel] = loc_of(sha)
+                    total += current[rel]
+        previous = commit
+        yield {"commit": commit, "date": date, "files": len(current),
+               "loc": total, "delta": total - before, "changed": changed}
@@ -0,0 +1,122 @@
+"""
+File: include_graph_report.py
+
+Include-graph cost report for cc_loc_counter (--graph-report).
+
+Builds the include graph from the closures computed by IncludeDiscovery and
+reports what makes translation units (TUs) expensive to compile:
+  - TU closure size: files and lines pulled in by each translation unit.
+  - Header fan-in: how many TUs pull each header in, and the lines parsed
+    because of it over all TUs (fan-in x LOC).
+  - Heaviest include edges: for each edge 'a -> b', the lines reachable from
+    b (b and everything it includes transitively), weighted by the number of
+    TUs whose closure contains a. Splitting or forward-declaring the targets
+    of the top edges removes the most parsing work.
+
+Nodes are basenames, consistent with cc_loc_counter treating files with the
+same basename as identical.
+"""
+from __future__ import annotations
+import os
+from typing import Dict, List, Set, Tuple
+
+
+class IncludeGraph:
+    """Include graph over the files discovered for a set of translation units."""
+
+    def __init__(self, discovery, closures: List[Tuple[str, List[str]]],
+                 exclude_blank: bool = True):
+        # basename -> path shown in reports (first one discovered)
+        self.node_path: Dict[str, str] = {}
+        # basename -> LOC
+        self.node_loc: Dict[str, int] = {}
+        # basename -> included basenames
+        self.edges: Dict[str, Set[str]] = {}
+        # (TU path, basenames in its closure)
+        self.tu_nodes: List[Tuple[str, List[str]]] = []
+
+        for start_path, files in closures:
+            names = []
+            for p in files:
+                bn = os.path.basename(p)
+                names.append(bn)
+                if bn in self.node_path:
+                    continue
+                self.node_path[bn] = p
+                self.node_loc[bn] = discovery.loc(p, exclude_blank)
+                targets = self.edges.setdefault(bn, set())
+                for inc in discovery.includes_of(p):
+                    inc_bn = os.path.basename(inc)
+                    if inc_bn != bn:
+                        targets.add(inc_bn)
+            self.tu_nodes.append((start_path, names))
+
+    def reachable(self, node: str) -> Set[str]:
+        """node and every basename it includes transitively."""
+        seen = {node}
+        stack = [node]
+        while stack:
+            for nxt in self.edges.get(stack.pop(), ()):
+                if nxt not in seen:
+                    seen.add(nxt)
+                    stack.append(nxt)
+        return seen
+
+    def tu_costs(self) -> List[Tuple[str, int, int]]:
+        """(TU path, files, LOC) sorted by LOC, largest first."""
+        rows = [(tu, len(names), sum(self.node_loc[n] for n in names))
+                for tu, names in self.tu_nodes]
+        return sorted(rows, key=lambda r: (-r[2], r[0]))
+
+    def fan_in(self) -> List[Tuple[str, int, int]]:
+        """
+        (header path, TUs including it, LOC) sorted by TUs x LOC, largest first.
+        The translation units themselves are not ranked.
+        """
+        tus = {names[0] for _, names in self.tu_nodes if names}
+        counts: Dict[str, int] = {}
+        for _, names in self.tu_nodes:
+            for n in names:
+                if n not in tus:
+                    counts[n] = counts.get(n, 0) + 1
+        rows = [(self.node_path[n], c, self.node_loc[n]) for n, c in counts.items()]
+        return sorted(rows, key=lambda r: (-r[1] * r[2], -r[1], r[0]))
+
+    def heaviest_edges(self) -> List[Tuple[str, str, int, int]]:
+        """
+        (from path, to path, lines reachable from the target, TUs containing the
+        source) sorted by reachable lines x TUs, largest first.
+        """
+        tu_count: Dict[str, int] = {}
+        for _, names in self.tu_nodes:
+            for n in names:
+                tu_count[n] = tu_count.get(n, 0) + 1
+        reach_loc: Dict[str, int] = {}
+        rows = []
+        for src, targets in self.edges.items():
+            for dst in targets:
+                if dst not in self.node_path:
+                    continue
+                if dst not in reach_loc:
+                    reach_loc[dst] = sum(self.node_loc.get(n, 0) for n in self.reachable(dst))
+                rows.append((self.node_path[src], self.node_path[dst],
+                             reach_loc[dst], tu_count.get(src, 0)))
+        return sorted(rows, key=lambda r: (-r[2] * r[3], -r[2], r[0], r[1]))
+
+
+def print_graph_report(graph: IncludeGraph, top: int = 20) -> None:
+    print(f"\n# Include graph: {len(graph.node_path)} files, "
+          f"{sum(len(t) for t in graph.edges.values())} edges, "
+          f"{len(graph.tu_nodes)} translation units")
+
+    print("\n# Transitive closure per translation unit (lines, files):")
+    for tu, files, loc in graph.tu_costs()[:top]:
+        print(f"{loc:8d} {files:6d}  {tu}")
+
+    print("\n# Header fan-in (TUs x lines, TUs, lines):")
+    for path, tus, loc in graph.fan_in()[:top]:
+        print(f"{tus * loc:8d} {tus:6d} {loc:8d}  {path}")
+
+    print("\n# Heaviest include edges (TUs x reachable lines, TUs, reachable lines):")
+    for src, dst, loc, tus in graph.heaviest_edges()[:top]:
+        print(f"{tus * loc:8d} {tus:6d} {loc:8d}  {src} -> {dst}")
@@ -0,0 +1,172 @@
+"""
+File: loc_cache.py
+
+Persistent per-file cache for cc_loc_counter.
+
+Each entry is keyed by the absolute file path and remembers the file size,
+mtime and SHA-1 of its content, together with the values computed for it
+(the scan_file result: include list and LOC counts). An entry is reused when:
+  - size and mtime are unchanged (the file is not read at all), or
+  - size is unchanged and the content hash still matches (e.g. the file was
+    touched by a checkout or submodule update without changing its content).
+Otherwise the entry is discarded and the values are recomputed. The hash of
+the new content is then taken from the buffer the scanner reads (see put), so
+a changed file is read only once.
+
+Results for content read from git objects (cc_loc_counter --rev/--diff) are
+stored separately, keyed by blob SHA. Those never go stale.
+
+The cache is stored as a single JSON file and written atomically (through a
+unique temporary file, so concurrent runs do not write over each other's).
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "cc_loc_counter", "cache.json")
+
+CACHE_VERSION = 2
+
+
+def file_sha1(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class LocCache:
+    """
+    On-disk cache of per-file results.
+    Values are stored under a field name, e.g. "scan".
+    """
+
+    def __init__(self, cache_path: str = DEFAULT_CACHE_PATH):
+        self.cache_path = os.path.abspath(cache_path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        # git blob SHA -> {field: value}
+        self.blobs: Dict[str, Dict[str, Any]] = {}
+        # path -> True if the entry matches the file on disk (checked once per run)
+        self._fresh: Dict[str, bool] = {}
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.entries = data.get("files", {})
+                self.blobs = data.get("blobs", {})
+        except Exception as e:
+            print(f"[WARN] Ignoring unreadable cache {self.cache_path}: {e}",
+                  file=sys.stderr)
+
+    def _validate(self, key: str) -> bool:
+        """Make sure the entry for key describes the current file content."""
+        if key in self._fresh:
+            return self._fresh[key]
+        try:
+            st = os.stat(key)
+        except OSError:
+            self._fresh[key] = False
+            return False
+
+        entry = self.entries.get(key)
+        sha1 = None
+        if entry is not None and entry.get("size") == st.st_size:
+            if entry.get("mtime_ns") == st.st_mtime_ns:
+                self._fresh[key] = True
+                return True
+            if entry.get("sha1"):
+                try:
+                    sha1 = file_sha1(key)
+                except OSError:
+                    self._fresh[key] = False
+                    return False
+                if entry["sha1"] == sha1:
+                    entry["mtime_ns"] = st.st_mtime_ns
+                    self._dirty = True
+                    self._fresh[key] = True
+                    return True
+
+        # New or changed file: start a fresh entry for the current content.
+        # A different size means different content, so the file is not hashed
+        # here; put() records the hash of what was actually scanned.
+        self.entries[key] = {
+            "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": sha1}
+        self._dirty = True
+        self._fresh[key] = True
+        return True
+
+    def get(self, path: str, field: str) -> Optional[Any]:
+        """Return the cached value of field for path, or None if it must be recomputed."""
+        key = os.path.abspath(path)
+        if self._validate(key) and field in self.entries[key]:
+            self.hits += 1
+            return self.entries[key][field]
+        self.misses += 1
+        return None
+
+    def put(self, path: str, field: str, value: Any, sha1: Optional[str] = None) -> None:
+        """
+        Store value under field for path. sha1 is the hash of the content value
+        was computed from; without it, a new entry is hashed from the file.
+        """
+        key = os.path.abspath(path)
+        if not self._validate(key):
+            return
+        entry = self.entries[key]
+        if sha1 is not None:
+            entry["sha1"] = sha1
+        elif not entry.get("sha1"):
+            try:
+                entry["sha1"] = file_sha1(key)
+            except OSError:
+                return
+        entry[field] = value
+        self._dirty = True
+
+    def get_blob(self, sha: str, field: str) -> Optional[Any]:
+        """Return the cached value of field for a git blob, or None."""
+        value = self.blobs.get(sha, {}).get(field)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put_blob(self, sha: str, field: str, value: Any) -> None:
+        self.blobs.setdefault(sha, {})[field] = value
+        self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        try:
+            cache_dir = os.path.dirname(self.cache_path)
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=cache_dir, prefix=os.path.basename(self.cache_path) + ".", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"version": CACHE_VERSION, "files": self.entries,
+                               "blobs": self.blobs}, f)
+                os.replace(tmp_path, self.cache_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._dirty = False
+        except Exception as e:
+            print(f"[WARN] Failed to write cache {self.cache_path}: {e}",
+                  file=sys.stderr)
@@ -0,0 +1,186 @@
+"""
+File: org_loc_scan.py
+
+Org-wide LOC scan over every repository listed in MCAP_info.
+
+- Scans <workspace>/<repository> for each entry of MCAP_info.repository_list,
+  including checked-out submodules.
+- Repositories are processed concurrently in a bounded pool of worker processes.
+- Every code file is identified by the SHA-1 of its content, so files shared
+  through submodules (e.g. base_utility_cpp in nearly every repository) are
+  counted once in the organisation total.
+- LOC follows cc_loc_counter's rules (comment lines and, by default, blank
+  lines are excluded).
+
+Usage:
+        python org_loc_scan.py [--folder /path/to/workspace] [--jobs N]
+                               [--walker git|scandir|os-walk] [--include-blanks]
+                               [--csv out.csv] [--json out.json]
+
+Notes:
+- If --folder is omitted, a folder selection dialog will appear.
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from analyzer.buffer_scanner import scan_buffer
+from analyzer.cc_loc_counter import DEFAULT_EXTS, is_code_like, scan_loc
+from analyzer.file_enumeration import WALKERS, iter_files
+from parameter.MCAP_info import MCAP_info
+
+
+def scan_repository(repo_path: str, exts: List[str], walker: str = "git",
+                    exclude_blank: bool = True) -> Tuple[List[Tuple[str, str, int]], float]:
+    """
+    Return ([(relative path, content SHA-1, LOC), ...], seconds) for every
+    code file of one repository. Each file is read once for hashing and counting.
+    """
+    t0 = time.perf_counter()
+    files: List[Tuple[str, str, int]] = []
+    for p in iter_files(repo_path, walker):
+        if not is_code_like(p, exts):
+            continue
+        try:
+            with open(p, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            print(f"[WARN] Failed to read {p}: {e}", file=sys.stderr)
+            continue
+        loc = scan_loc(scan_buffer(data), exclude_blank)
+        files.append((os.path.relpath(p, repo_path), hashlib.sha1(data).hexdigest(), loc))
+    return files, time.perf_counter() - t0
+
+
+def summarize(results: Dict[str, List[Tuple[str, str, int]]]) -> Tuple[List[dict], dict]:
+    """
+    Per-repository rows and the organisation summary.
+    shared_loc is the LOC of files whose content also appears in another repository.
+    """
+    repos_of_hash: Dict[str, set] = {}
+    loc_of_hash: Dict[str, int] = {}
+    for repo, files in results.items():
+        for _, sha, loc in files:
+            repos_of_hash.setdefault(sha, set()).add(repo)
+            loc_of_hash[sha] = loc
+
+    rows = []
+    for repo, files in results.items():
+        rows.append({
+            "repository": repo,
+            "files": len(files),
+            "loc": sum(loc for _, _, loc in files),
+            "shared_loc": sum(loc for _, sha, loc in files if len(repos_of_hash[sha]) > 1),
+        })
+    summary = {
+        "repositories": len(results),
+        "files": sum(r["files"] for r in rows),
+        "loc": sum(r["loc"] for r in rows),
+        "unique_files": len(loc_of_hash),
+        "unique_loc": sum(loc_of_hash.values()),
+    }
+    return rows, summary
+
+
+def _select_folder_via_gui() -> Optional[str]:
+    import tkinter as tk
+    from tkinter import filedialog
+
+    root = tk.Tk()
+    root.withdraw()
+    folder_path = filedialog.askdirectory()
+    return folder_path or None
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Count non-comment LOC of all C/C++ files in every MCAP_info repository "
+                    "of a workspace, deduplicating shared files by content.")
+    ap.add_argument("--folder", type=str, default=None,
+                    help="Workspace folder containing the cloned repositories.")
+    ap.add_argument("--jobs", type=int, default=0,
+                    help="Repositories scanned concurrently (default: 0 = one per CPU).")
+    ap.add_argument("--walker", choices=WALKERS, default="git",
+                    help="File enumeration backend (default: git, falls back to scandir).")
+    ap.add_argument("--exts", nargs="*", default=DEFAULT_EXTS,
+                    help=f"File extensions considered as code (default: {DEFAULT_EXTS})")
+    ap.add_argument("--include-blanks", action="store_true",
+                    help="Count blank-only lines as code (default: exclude blanks).")
+    ap.add_argument("--csv", help="Optional path to write the per-repository CSV report.")
+    ap.add_argument("--json", help="Optional path to write the report as JSON.")
+    args = ap.parse_args()
+
+    folder_path = args.folder or _select_folder_via_gui()
+    if not folder_path:
+        raise ValueError("Folder is not selected.")
+    folder_path = os.path.abspath(folder_path)
+
+    repo_paths = {}
+    for repo in MCAP_info.repository_list:
+        path = os.path.join(folder_path, repo)
+        if os.path.isdir(path):
+            repo_paths[repo] = path
+        else:
+            print(f"[WARN] Repository not found, skipped: {path}", file=sys.stderr)
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    jobs = max(1, min(jobs, len(repo_paths)))
+    results: Dict[str, List[Tuple[str, str, int]]] = {}
+    seconds: Dict[str, float] = {}
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            repo: executor.submit(scan_repository, path, args.exts, args.walker,
+                                  not args.include_blanks)
+            for repo, path in repo_paths.items()
+        }
+        # Collect in MCAP_info order so the report is stable
+        for repo, future in futures.items():
+            results[repo], seconds[repo] = future.result()
+
+    rows, summary = summarize(results)
+
+    print(f"# Org-wide LOC: {folder_path} ({summary['repositories']} repositories, "
+          f"{jobs} workers)")
+    print(f"{'repository':30s} {'files':>7s} {'loc':>9s} {'shared':>9s} {'sec':>7s}")
+    for row in rows:
+        print(f"{row['repository']:30s} {row['files']:7d} {row['loc']:9d} "
+              f"{row['shared_loc']:9d} {seconds[row['repository']]:7.2f}")
+    print(f"\n# SUM OF REPOSITORY TOTALS: {summary['loc']} LOC in {summary['files']} files")
+    print(f"# ORG TOTAL (deduplicated by content): {summary['unique_loc']} LOC "
+          f"in {summary['unique_files']} files")
+
+    if args.csv:
+        try:
+            import csv
+            with open(args.csv, "w", newline="", encoding="utf-8") as f:
+                w = csv.writer(f)
+                w.writerow(["repository", "files", "loc", "shared_loc"])
+                for row in rows:
+                    w.writerow([row["repository"], row["files"], row["loc"], row["shared_loc"]])
+                w.writerow(["TOTAL", summary["files"], summary["loc"], ""])
+                w.writerow(["TOTAL (deduplicated)", summary["unique_files"],
+                            summary["unique_loc"], ""])
+            print(f"\nCSV written to: {os.path.abspath(args.csv)}")
+        except Exception as e:
+            print(f"[WARN] Failed to write CSV: {e}", file=sys.stderr)
+
+    if args.json:
+        try:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"repositories": rows, "summary": summary}, f, indent=2)
+            print(f"JSON written to: {os.path.abspath(args.json)}")
+        except Exception as e:
+            print(f"[WARN] Failed to write JSON: {e}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+File: phase_profiler.py
+
+Phase timing for cc_loc_counter (--profile / --profile-ndjson / --cprofile).
+
+IncludeDiscovery reports into a PhaseProfiler, per phase:
+  - index   : enumerating root and building the basename index
+  - scan    : reading files and parsing includes / counting lines (one pass)
+  - resolve : resolving include targets to paths under root
+  - count   : LOC from the scan results (files: unique files counted)
+Wall time is measured in the calling process, around the whole phase, so it
+means the same in the serial path and with --jobs (where scan runs in
+worker processes).
+"""
+from __future__ import annotations
+import json
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+PHASES = ["index", "scan", "resolve", "count"]
+
+
+class PhaseStats:
+    def __init__(self):
+        self.seconds = 0.0
+        self.files = 0
+        self.bytes = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "seconds": round(self.seconds, 6),
+            "files": self.files,
+            "bytes": self.bytes,
+            "files_per_sec": round(self.files / self.seconds, 1) if self.seconds > 0 else None,
+            "mib_per_sec": round(self.bytes / self.seconds / 2 ** 20, 2) if self.seconds > 0 else None,
+        }
+
+
+class PhaseProfiler:
+    """Wall time, files and bytes accumulated per phase."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, PhaseStats] = {name: PhaseStats() for name in PHASES}
+
+    @contextmanager
+    def phase(self, name: str, files: int = 0, nbytes: int = 0) -> Iterator[PhaseStats]:
+        """Time a block; files/bytes can also be added to the yielded stats inside it."""
+        stats = self.phases.setdefault(name, PhaseStats())
+        stats.files += files
+        stats.bytes += nbytes
+        t0 = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.seconds += time.perf_counter() - t0
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self) -> dict:
+        return {name: stats.as_dict() for name, stats in self.phases.items()}
+
+    def report(self, stream=None) -> None:
+        stream = stream or sys.stderr
+        total = self.elapsed()
+        print(f"\n# Profile (wall time {total:.3f}s):", file=stream)
+        print(f"# {'phase':8s} {'seconds':>9s} {'share':>6s} {'files':>8s} {'bytes':>12s} "
+              f"{'files/s':>10s} {'MiB/s':>8s}", file=stream)
+        for name, stats in self.phases.items():
+            d = stats.as_dict()
+            share = 100.0 * stats.seconds / total if total > 0 else 0.0
+            files_per_sec = f"{d['files_per_sec']:10.1f}" if d["files_per_sec"] is not None else f"{'-':>10s}"
+            mib_per_sec = f"{d['mib_per_sec']:8.2f}" if d["mib_per_sec"] is not None and stats.bytes else f"{'-':>8s}"
+            print(f"# {name:8s} {stats.seconds:9.4f} {share:5.1f}% {stats.files:8d} "
+                  f"{stats.bytes:12d} {files_per_sec} {mib_per_sec}", file=stream)
+
+    def append_ndjson(self, path: str, run: Optional[dict] = None) -> None:
+        """Append one JSON line describing this run (for tracking trends over time)."""
+        record = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+        record.update(run or {})
+        record["seconds"] = round(self.elapsed(), 6)
+        record["phases"] = self.as_dict()
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"[WARN] Failed to write profile NDJSON: {e}", file=sys.stderr)
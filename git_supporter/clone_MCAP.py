@@ -1,12 +1,21 @@
 """
 This script provides a command-line utility to clone multiple Git repositories listed in the MCAP_info module.
 It allows the user to specify a target folder via a command-line argument or a GUI folder selection dialog.
-The script changes the working directory to the selected folder and clones each repository using the system's Git command.
+The repositories are cloned concurrently (--jobs) into the selected folder, without changing the working directory.
+Optionally, clones can be partial (--filter=blob:none) or shallow (--depth N), and submodules can be
+initialized in parallel (--recurse-submodules, --submodule-jobs N).
+With --mirror-store, the local bare mirrors (see mirror_store.py) are refreshed first, and clones and
+submodules borrow their objects from them, so only what changed upstream is downloaded.
+--remote-base clones (and refreshes the mirrors) from <remote-base>/<repository>.git instead of the
+MCAP_info URLs, e.g. 'file:///srv/git' to work from local repositories without network access.
+Repositories whose folder already exists are skipped. A summary of each repository's status and duration
+is printed at the end.
 """
 from __future__ import annotations
 
 import os
 import sys
+from functools import partial
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
@@ -15,8 +24,61 @@ import argparse
 import tkinter as tk
 from tkinter import filedialog
 
+from git_supporter.mirror_store import DEFAULT_STORE, MirrorStore, with_remote_base
+from git_supporter.parallel_runner import (
+    RepoResult, format_output, print_results, run_for_repositories, run_git)
 from parameter.MCAP_info import MCAP_info
 
+DEFAULT_CLONE_JOBS = 4
+DEFAULT_SUBMODULE_JOBS = 8
+
+
+def clone_repository(item, folder_path, filter_spec=None, depth=None,
+                     recurse_submodules=False, submodule_jobs=DEFAULT_SUBMODULE_JOBS,
+                     shallow_submodules=False, mirror_store=None):
+    """
+    Clone one repository (name, url) into folder_path/name and optionally
+    initialize its submodules, fetching up to submodule_jobs of them at once.
+    With a MirrorStore, objects are borrowed from the local mirrors.
+    """
+    name, url = item
+    path = os.path.join(folder_path, name)
+    if os.path.exists(path):
+        return RepoResult(name, path, "exists", detail="folder already exists, not cloned")
+
+    clone_args = ["clone", "--quiet"]
+    if filter_spec:
+        clone_args.append(f"--filter={filter_spec}")
+    if depth:
+        clone_args += ["--depth", str(depth)]
+    if mirror_store is not None:
+        clone_args += mirror_store.clone_args(url)
+    result = run_git(clone_args + [url, name], cwd=folder_path)
+    if result.returncode != 0:
+        return RepoResult(name, path, "failed", detail="git clone failed",
+                          output=format_output(result))
+    detail = "cloned"
+
+    if recurse_submodules:
+        extra_args = []
+        if filter_spec:
+            extra_args.append(f"--filter={filter_spec}")
+        if shallow_submodules:
+            extra_args += ["--depth", "1"]
+        if mirror_store is not None:
+            # One submodule at a time, each referencing its own mirror
+            ok, output = mirror_store.update_submodules(path, extra_args)
+        else:
+            result = run_git(["submodule", "update", "--init", "--recursive",
+                              "--jobs", str(submodule_jobs)] + extra_args, cwd=path)
+            ok, output = result.returncode == 0, format_output(result)
+        if not ok:
+            return RepoResult(name, path, "failed", detail="cloned, submodule update failed",
+                              output=output)
+        detail = "cloned with submodules"
+
+    return RepoResult(name, path, "ok", detail=detail)
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -27,6 +89,62 @@ def main():
         help="Path to the folder where repositories will be cloned.",
         required=False
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_CLONE_JOBS,
+        help=f"Number of repositories cloned at the same time (default: {DEFAULT_CLONE_JOBS})."
+    )
+    parser.add_argument(
+        "--filter",
+        type=str,
+        default=None,
+        metavar="SPEC",
+        help="Partial clone filter, e.g. 'blob:none' (file contents are fetched on demand)."
+    )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=None,
+        help="Shallow clone with history truncated to this many commits."
+    )
+    parser.add_argument(
+        "--recurse-submodules",
+        action="store_true",
+        help="Also initialize submodules (recursively) after cloning."
+    )
+    parser.add_argument(
+        "--submodule-jobs",
+        type=int,
+        default=DEFAULT_SUBMODULE_JOBS,
+        help=f"Submodules fetched in parallel per repository (default: {DEFAULT_SUBMODULE_JOBS})."
+    )
+    parser.add_argument(
+        "--shallow-submodules",
+        action="store_true",
+        help="Clone submodules with depth 1."
+    )
+    parser.add_argument(
+        "--mirror-store",
+        nargs="?",
+        const=DEFAULT_STORE,
+        default=None,
+        metavar="DIR",
+        help=f"Refresh and clone through local bare mirrors (default folder: {DEFAULT_STORE})."
+    )
+    parser.add_argument(
+        "--dissociate",
+        action="store_true",
+        help="With --mirror-store, copy the borrowed objects instead of keeping a link to the mirrors."
+    )
+    parser.add_argument(
+        "--remote-base",
+        type=str,
+        default=None,
+        metavar="URL",
+        help="Clone from <remote-base>/<repository>.git instead of the MCAP_info URLs "
+             "(e.g. file:///srv/git for an offline clone)."
+    )
     args = parser.parse_args()
 
     folder_path = args.folder
@@ -40,10 +158,30 @@ def main():
     if not folder_path:
         raise ValueError("Folder is not selected.")
 
-    os.chdir(folder_path)
+    folder_path = os.path.abspath(folder_path)
+    os.makedirs(folder_path, exist_ok=True)
+
+    repositories = with_remote_base(MCAP_info.repository_list, args.remote_base)
+
+    mirror_store = None
+    if args.mirror_store:
+        mirror_store = MirrorStore(args.mirror_store, dissociate=args.dissociate)
+        print_results(mirror_store.refresh_all(repositories, args.jobs),
+                      f"Mirror store {mirror_store.store_dir}")
+
+    clone = partial(clone_repository,
+                    folder_path=folder_path,
+                    filter_spec=args.filter,
+                    depth=args.depth,
+                    recurse_submodules=args.recurse_submodules,
+                    submodule_jobs=args.submodule_jobs,
+                    shallow_submodules=args.shallow_submodules,
+                    mirror_store=mirror_store)
+    results = run_for_repositories(clone, list(repositories.items()), args.jobs)
+    print_results(results, f"Clone into {folder_path}")
 
-    for repo_path in MCAP_info.repository_list.values():
-        os.system("git clone " + repo_path)
+    if any(r.failed for r in results):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,176 @@
+"""
+This module provides read-only git state probes that read the .git directory directly instead of
+starting a git process: the current branch (HEAD), whether a ref exists and what it points to
+(loose refs and packed-refs), and the URL of a remote.
+
+- Submodules and linked worktrees are followed through their '.git' file ("gitdir: ...") and the
+  'commondir' file of the git directory.
+- When the layout is something this reader does not understand (reftable ref storage, a config
+  with [include] sections, an unreadable HEAD, ...) the answer comes from git itself instead.
+
+Functions:
+    current_branch(path): Returns the checked-out branch name, or None when HEAD is detached.
+    branch_exists(path, branch): Returns True if refs/heads/<branch> exists.
+    resolve_ref(path, ref): Returns the commit a ref (or HEAD) points to, or None.
+    remote_url(path, remote): Returns the URL of a remote, or None.
+"""
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from git_supporter.repo_discovery import read_gitdir
+
+MAX_SYMREF_DEPTH = 5
+# Refs stored per worktree (in the git directory, not in the common directory)
+PER_WORKTREE_PREFIXES = ("refs/bisect/", "refs/worktree/", "refs/rewritten/")
+
+
+class UnsupportedLayout(Exception):
+    """The .git layout cannot be read directly; ask git instead."""
+
+
+def _git(path: str, *args: str) -> Optional[str]:
+    result = subprocess.run(["git", *args], cwd=path, capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def _read_line(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+
+class GitState:
+    """Direct reader of HEAD, refs and config of the checkout at path."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.gitdir = read_gitdir(path)
+        if self.gitdir is None or not os.path.isdir(self.gitdir):
+            raise UnsupportedLayout(f"no git directory for {path}")
+        if os.path.isdir(os.path.join(self.gitdir, "reftable")):
+            raise UnsupportedLayout("reftable ref storage")
+        commondir = _read_line(os.path.join(self.gitdir, "commondir"))
+        self.commondir = (os.path.normpath(os.path.join(self.gitdir, commondir))
+                          if commondir else self.gitdir)
+        self._packed_refs: Optional[Dict[str, str]] = None
+
+    def packed_refs(self) -> Dict[str, str]:
+        if self._packed_refs is None:
+            refs: Dict[str, str] = {}
+            try:
+                with open(os.path.join(self.commondir, "packed-refs"), "r", encoding="utf-8") as f:
+                    for line in f:
+                        # "# pack-refs with: ..." header and "^<sha>" peeled tag lines
+                        if line.startswith(("#", "^")):
+                            continue
+                        sha, _, name = line.strip().partition(" ")
+                        if name:
+                            refs[name] = sha
+            except FileNotFoundError:
+                pass
+            self._packed_refs = refs
+        return self._packed_refs
+
+    def _ref_file(self, ref: str) -> str:
+        per_worktree = "/" not in ref or ref.startswith(PER_WORKTREE_PREFIXES)
+        return os.path.join(self.gitdir if per_worktree else self.commondir, *ref.split("/"))
+
+    def read_ref(self, ref: str) -> Tuple[Optional[str], Optional[str]]:
+        """(commit, symbolic target) of ref without following it; (None, None) if missing."""
+        content = _read_line(self._ref_file(ref))
+        if content is None:
+            return self.packed_refs().get(ref), None
+        if content.startswith("ref:"):
+            return None, content[len("ref:"):].strip()
+        if len(content) in (40, 64):
+            return content, None
+        raise UnsupportedLayout(f"unexpected content in {ref}")
+
+    def resolve(self, ref: str) -> Optional[str]:
+        """Commit ref points to, following symbolic refs."""
+        for _ in range(MAX_SYMREF_DEPTH):
+            sha, target = self.read_ref(ref)
+            if target is None:
+                return sha
+            ref = target
+        raise UnsupportedLayout("symbolic ref chain too long")
+
+    def head_ref(self) -> Optional[str]:
+        """Full name of the checked-out branch ("refs/heads/main"), or None when detached."""
+        sha, target = self.read_ref("HEAD")
+        if sha is None and target is None:
+            raise UnsupportedLayout("HEAD cannot be read")
+        return target
+
+    def remote_url(self, remote: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self.commondir, "config"), "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError:
+            raise UnsupportedLayout("config cannot be read")
+        section = None
+        url = None
+        for line in lines:
+            line = line.strip()
+            if line.startswith("["):
+                section = line.strip("[]").strip()
+                if section.lower().startswith("include"):
+                    raise UnsupportedLayout("config uses includes")
+            elif section == f'remote "{remote}"' and "=" in line:
+                key, value = line.split("=", 1)
+                if key.strip().lower() == "url":
+                    url = value.strip().strip('"')
+        return url
+
+
+def _state(path: str) -> Optional[GitState]:
+    try:
+        return GitState(path)
+    except UnsupportedLayout:
+        return None
+
+
+def current_branch(path: str) -> Optional[str]:
+    """Branch checked out in path ("main"), or None when HEAD is detached."""
+    state = _state(path)
+    if state is not None:
+        try:
+            ref = state.head_ref()
+            return ref[len("refs/heads/"):] if ref and ref.startswith("refs/heads/") else None
+        except UnsupportedLayout:
+            pass
+    return _git(path, "symbolic-ref", "-q", "--short", "HEAD")
+
+
+def resolve_ref(path: str, ref: str) -> Optional[str]:
+    """Commit that ref ("HEAD", "refs/heads/main", "refs/remotes/origin/main", ...) points to."""
+    state = _state(path)
+    if state is not None:
+        try:
+            return state.resolve(ref)
+        except UnsupportedLayout:
+            pass
+    return _git(path, "rev-parse", "--verify", "-q", ref + "^{commit}")
+
+
+def branch_exists(path: str, branch: str) -> bool:
+    return resolve_ref(path, f"refs/heads/{branch}") is not None
+
+
+def remote_url(path: str, remote: str = "origin") -> Optional[str]:
+    state = _state(path)
+    if state is not None:
+        try:
+            return state.remote_url(remote)
+        except UnsupportedLayout:
+            pass
+    return _git(path, "remote", "get-url", remote)
@@ -9,6 +9,8 @@ sys.path.append(str(Path(__file__).resolve().parents[1]))
 import tkinter as tk
 from tkinter import filedialog
 
+from git_supporter.repo_discovery import child_checkouts
+from git_supporter.repo_lock import RepoLock
 from submodule_updater.common_functions import run_os_command
 
 
@@ -23,33 +25,37 @@ def select_root_folder():
 
 
 def list_git_repositories(root_folder):
-    git_repos = []
-    for entry in Path(root_folder).iterdir():
-        if entry.is_dir() and (entry / ".git").is_dir():
-            git_repos.append(entry)
-    return git_repos
+    # Subfolders with a '.git' directory; the selected folder itself is never included
+    return [Path(checkout.path) for checkout in child_checkouts(root_folder)
+            if not checkout.is_submodule]
 
 
 def merge_main_to_develop(repo_path):
     cwd = os.path.abspath(repo_path)
     print(f"\n--- {cwd} ---")
 
-    run_os_command("git fetch", cwd)
-    run_os_command("git checkout main", cwd)
-    run_os_command("git pull", cwd)
+    # Waits while another script works in this repository (the wait is reported on stderr)
+    with RepoLock(cwd, "merge_main_to_develop"):
+        _merge_main_to_develop(cwd)
 
-    main_sha = run_os_command("git rev-parse origin/main", cwd).stdout.strip()
+
+def _merge_main_to_develop(cwd):
+    run_os_command(["git", "fetch"], cwd)
+    run_os_command(["git", "checkout", "main"], cwd)
+    run_os_command(["git", "pull"], cwd)
+
+    main_sha = run_os_command(["git", "rev-parse", "origin/main"], cwd).stdout.strip()
     develop_sha = run_os_command(
-        "git rev-parse origin/develop", cwd).stdout.strip()
+        ["git", "rev-parse", "origin/develop"], cwd).stdout.strip()
 
     if main_sha == develop_sha:
         print("mainとdevelopは同じコミットを指しています。マージをスキップします。")
         return
 
-    run_os_command("git checkout develop", cwd)
-    run_os_command("git pull", cwd)
-    run_os_command("git merge --ff main", cwd)
-    run_os_command("git push", cwd)
+    run_os_command(["git", "checkout", "develop"], cwd)
+    run_os_command(["git", "pull"], cwd)
+    run_os_command(["git", "merge", "--ff", "main"], cwd)
+    run_os_command(["git", "push"], cwd)
 
 
 if __name__ == "__main__":
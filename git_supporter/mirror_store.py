@@ -0,0 +1,149 @@
+"""
+This module provides a local store of bare mirrors, one per MCAP_info repository, so that clones and
+submodule initialization read objects from disk instead of downloading them again.
+(base_utility_cpp, for example, is a submodule of nearly every repository.)
+
+- refresh_all creates missing mirrors with 'git clone --mirror' and updates existing ones incrementally
+  with 'git remote update --prune', several repositories at once.
+- clone_args returns '--reference-if-able <mirror>' for a repository URL, to be added to 'git clone'.
+- update_submodules initializes the submodules of a checkout one by one, passing '--reference <mirror>'
+  for every submodule whose repository has a mirror (matched by repository name, so https, ssh and
+  relative URLs all match).
+Clones made this way borrow objects from the mirror through alternates. Mirrors are therefore configured
+never to prune objects; pass --dissociate to copy the borrowed objects instead.
+
+Usage (refresh the store):
+        python mirror_store.py [--store DIR] [--jobs N] [--remote-base URL]
+
+--remote-base replaces the host part of every MCAP_info URL, e.g. 'file:///srv/git' to refresh the
+store from local repositories without network access.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from git_supporter.parallel_runner import (
+    DEFAULT_JOBS, RepoResult, format_output, print_results, run_for_repositories, run_git)
+from git_supporter.repo_discovery import parse_gitmodules
+from parameter.MCAP_info import MCAP_info
+
+DEFAULT_STORE = os.path.join(os.path.expanduser("~"), ".cache", "MCAP_mirrors")
+
+
+def repository_name(url: str) -> str:
+    """'https://github.com/org/base_utility_cpp.git' -> 'base_utility_cpp'."""
+    name = url.rstrip("/").replace("\\", "/").rsplit("/", 1)[-1].rsplit(":", 1)[-1]
+    return name[:-4] if name.endswith(".git") else name
+
+
+def with_remote_base(repositories: Dict[str, str], remote_base: Optional[str]) -> Dict[str, str]:
+    """{name: url} with every url replaced by <remote_base>/<name>.git (unchanged without a base)."""
+    if not remote_base:
+        return dict(repositories)
+    base = remote_base.rstrip("/")
+    return {name: f"{base}/{name}.git" for name in repositories}
+
+
+class MirrorStore:
+    """Bare mirrors under store_dir, named <repository>.git."""
+
+    def __init__(self, store_dir: str = DEFAULT_STORE, dissociate: bool = False):
+        self.store_dir = os.path.abspath(store_dir)
+        self.dissociate = dissociate
+
+    def mirror_path(self, name: str) -> str:
+        return os.path.join(self.store_dir, name + ".git")
+
+    def mirror_for_url(self, url: str) -> Optional[str]:
+        """Mirror of the repository behind url, if the store has one."""
+        path = self.mirror_path(repository_name(url))
+        return path if os.path.isdir(path) else None
+
+    def refresh(self, item: Tuple[str, str]) -> RepoResult:
+        """Create the mirror of (name, url), or fetch what changed since the last refresh."""
+        name, url = item
+        path = self.mirror_path(name)
+        if not os.path.isdir(path):
+            os.makedirs(self.store_dir, exist_ok=True)
+            result = run_git(["clone", "--mirror", "--quiet", url, path])
+            if result.returncode != 0:
+                return RepoResult(name, path, "failed", detail="git clone --mirror failed",
+                                  output=format_output(result))
+            # Checkouts borrow objects from here: never prune them
+            run_git(["config", "gc.pruneExpire", "never"], cwd=path)
+            run_git(["config", "gc.reflogExpireUnreachable", "never"], cwd=path)
+            return RepoResult(name, path, "ok", detail="mirror created")
+
+        result = run_git(["remote", "update", "--prune"], cwd=path)
+        if result.returncode != 0:
+            return RepoResult(name, path, "failed", detail="git remote update failed",
+                              output=format_output(result))
+        return RepoResult(name, path, "ok", detail="mirror updated")
+
+    def refresh_all(self, repositories: Dict[str, str], jobs: int = DEFAULT_JOBS) -> List[RepoResult]:
+        return run_for_repositories(self.refresh, list(repositories.items()), jobs)
+
+    def clone_args(self, url: str) -> List[str]:
+        """Extra 'git clone' arguments to borrow objects from the mirror of url."""
+        mirror = self.mirror_for_url(url)
+        if mirror is None:
+            return []
+        return ["--reference-if-able", mirror] + (["--dissociate"] if self.dissociate else [])
+
+    def update_submodules(self, repo_path: str, extra_args: Optional[List[str]] = None,
+                          recursive: bool = True) -> Tuple[bool, str]:
+        """
+        'git submodule update --init' for each submodule of repo_path (and, if
+        recursive, of the submodules), referencing the matching mirror.
+        Returns (success, captured output of the failing command or "").
+        """
+        result = run_git(["submodule", "init"], cwd=repo_path)
+        if result.returncode != 0:
+            return False, format_output(result)
+        for _, sub_path, url in parse_gitmodules(repo_path):
+            args = ["submodule", "update", *(extra_args or [])]
+            mirror = self.mirror_for_url(url)
+            if mirror is not None:
+                args += ["--reference", mirror]
+                if self.dissociate:
+                    args.append("--dissociate")
+            result = run_git(args + ["--", sub_path], cwd=repo_path)
+            if result.returncode != 0:
+                return False, format_output(result)
+            if recursive:
+                ok, output = self.update_submodules(os.path.join(repo_path, sub_path),
+                                                    extra_args, recursive)
+                if not ok:
+                    return False, output
+        return True, ""
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Create or refresh the local bare mirrors of the repositories listed in MCAP_info.")
+    parser.add_argument("--store", type=str, default=DEFAULT_STORE,
+                        help=f"Folder holding the mirrors (default: {DEFAULT_STORE}).")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                        help=f"Mirrors refreshed at the same time (default: {DEFAULT_JOBS}).")
+    parser.add_argument("--remote-base", type=str, default=None,
+                        help="Fetch from <remote-base>/<repository>.git instead of the MCAP_info URLs "
+                             "(e.g. file:///srv/git for an offline refresh).")
+    args = parser.parse_args()
+
+    repositories = with_remote_base(MCAP_info.repository_list, args.remote_base)
+
+    store = MirrorStore(args.store)
+    results = store.refresh_all(repositories, args.jobs)
+    print_results(results, f"Mirror store {store.store_dir}")
+    if any(r.failed for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ import tkinter as tk
 from tkinter import filedialog
 from datetime import datetime
 from get_git_repository import get_git_repository
+from git_state import current_branch
 
 
 def orphan_pull():
@@ -20,13 +21,10 @@ def orphan_pull():
     folder_path, original_directory = get_git_repository()
     os.chdir(folder_path)
 
-    system_command = subprocess.run(
-        "git branch", shell=True, capture_output=True, text=True)
-    branch_list = system_command.stdout.split("\n")
-    for i in range(len(branch_list)):
-        if branch_list[i][:2] == "* ":
-            branch_name = branch_list[i][2:]
-            break
+    branch_name = current_branch(folder_path)
+    if branch_name is None:
+        print("HEAD is detached. Check out a branch first.")
+        return
 
     branch_name_temp = branch_name + "_temp"
 
@@ -13,6 +13,7 @@ import tkinter as tk
 from tkinter import filedialog
 from datetime import datetime
 from get_git_repository import get_git_repository
+from git_state import current_branch
 
 
 def orphan_push():
@@ -29,13 +30,11 @@ def orphan_push():
     subprocess.run("git config --local core.quotepath \"false\"", shell=True)
 
     # %% Orphan
-    system_command = subprocess.run(
-        "git branch", shell=True, capture_output=True, text=True)
-    branch_list = system_command.stdout.split("\n")
-    for i in range(len(branch_list)):
-        if branch_list[i][:2] == "* ":
-            branch_name = branch_list[i][2:]
-            break
+    branch_name = current_branch(folder_path)
+    if branch_name is None:
+        print("HEAD is detached. Check out a branch first.")
+        os.chdir(original_directory)
+        return
 
     temp_branch_name = branch_name + DateString
     temp_branch_name = temp_branch_name.replace("\n", "")
@@ -0,0 +1,116 @@
+"""
+This module provides the building blocks shared by the concurrent git scripts
+(clone, submodule update, pull, status).
+
+- run_git runs one git command with an argv list in a given directory, capturing
+  its output, so workers never change the process working directory.
+- run_for_repositories runs one function per repository in a bounded thread pool
+  and returns the results in input order.
+- RepoResult is the outcome of one repository operation, and print_results
+  prints them as one consolidated table.
+"""
+from __future__ import annotations
+
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from submodule_updater.command_runner import run_process
+
+DEFAULT_JOBS = 8
+
+
+class RepoResult:
+    """Outcome of one operation on one repository."""
+
+    def __init__(self, name: str, path: str, status: str = "ok",
+                 seconds: float = 0.0, detail: str = "", output: str = ""):
+        self.name = name
+        self.path = path
+        # "ok", "failed", "skipped", or an operation-specific word ("exists", "up-to-date")
+        self.status = status
+        self.seconds = seconds
+        # One-line summary shown in the table
+        self.detail = detail
+        # Captured output of the git commands, shown for failures
+        self.output = output
+
+    @property
+    def failed(self) -> bool:
+        return self.status == "failed"
+
+    def as_dict(self) -> dict:
+        return {"name": self.name, "path": self.path, "status": self.status,
+                "seconds": round(self.seconds, 3), "detail": self.detail}
+
+
+def run_git(args: Sequence[str], cwd: Optional[str] = None,
+            timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+    """
+    Run 'git <args>' in cwd and capture its output as text (never raises on exit code).
+    On timeout git and the helpers it started (ssh, git-remote-https) are killed and the
+    return code is 124 (see command_runner.run_process).
+    """
+    return run_process(["git", *args], cwd=cwd, timeout=timeout)
+
+
+def format_output(result: subprocess.CompletedProcess) -> str:
+    """Command line plus its captured output, for failure reports."""
+    cmd = " ".join(result.args) if isinstance(result.args, (list, tuple)) else str(result.args)
+    return f"$ {cmd}\n{result.stdout or ''}{result.stderr or ''}"
+
+
+def run_for_repositories(func: Callable[..., RepoResult], items: Sequence,
+                         jobs: int = DEFAULT_JOBS, progress: bool = True) -> List[RepoResult]:
+    """
+    Call func(item) for each item in a pool of `jobs` threads and return the
+    results in the order of items. Exceptions become "failed" results.
+    With progress, one line is printed to stderr as each repository finishes.
+    """
+    def timed(item) -> RepoResult:
+        t0 = time.perf_counter()
+        try:
+            result = func(item)
+        except Exception as e:
+            # Items are repository paths or (name, url) pairs
+            name = item[0] if isinstance(item, tuple) else str(item)
+            result = RepoResult(name, str(item), "failed", detail=str(e))
+        if not result.seconds:
+            result.seconds = time.perf_counter() - t0
+        return result
+
+    results: List[Optional[RepoResult]] = [None] * len(items)
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(items) or 1))) as executor:
+        futures = {executor.submit(timed, item): i for i, item in enumerate(items)}
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results[futures[future]] = result
+            if progress:
+                print(f"[INFO] ({done}/{len(items)}) {result.name}: {result.status} "
+                      f"({result.seconds:.1f}s)", file=sys.stderr)
+    return results
+
+
+def print_results(results: List[RepoResult], title: str, show_output: bool = True) -> None:
+    """Print one row per repository, then the captured output of the failures."""
+    width = max([len(r.name) for r in results] + [10])
+    print(f"\n# {title}")
+    print(f"{'repository':{width}s} {'status':10s} {'seconds':>8s}  detail")
+    for r in results:
+        print(f"{r.name:{width}s} {r.status:10s} {r.seconds:8.1f}  {r.detail}")
+
+    counts = {}
+    for r in results:
+        counts[r.status] = counts.get(r.status, 0) + 1
+    print("# " + ", ".join(f"{n} {status}" for status, n in counts.items())
+          + f" ({len(results)} repositories)")
+
+    if show_output:
+        for r in results:
+            if r.failed and r.output:
+                print(f"\n[ERROR] {r.name} ({r.path}):\n{r.output.rstrip()}", file=sys.stderr)
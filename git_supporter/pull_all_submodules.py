@@ -9,45 +9,63 @@ Functions:
       a list of directories under 'root_dir' that contain a '.git' folder,
         identifying them as Git repositories.
 
+When run as a script, every repository found is pulled concurrently (--jobs) by pull_engine,
+ without changing the working directory, and the results are printed as one table.
+ Repositories already up to date with upstream are skipped after a 'git ls-remote' pre-check.
+
 Classes:
     (No classes are defined in this module.)
 """
 
 import os
-import subprocess
 from get_git_repository import get_git_repository
+from repo_discovery import discover_repositories
+from pull_engine import DEFAULT_JOBS, DEFAULT_LOCK_TIMEOUT, pull_repositories, report
 
 
 def find_git_directories(root_dir):
     """
     Recursively searches for Git repositories within the specified root directory.
+    Submodules are found through .gitmodules by repo_discovery (the manifest makes repeat runs fast).
 
     Args:
         root_dir (str): The path to the root directory to search for Git repositories.
 
     Returns:
-        list: A list of directory paths that contain a '.git' directory,
-          indicating a Git repository.
+        list: A list of directory paths that contain a '.git' file,
+          indicating a submodule checkout.
     """
-    git_dirs = []
-    for dirpath, dirnames, filenames in os.walk(root_dir):
-        if '.git' in filenames:
-            git_dirs.append(dirpath)
-    return git_dirs
+    return [checkout.path for checkout in discover_repositories(root_dir)
+            if checkout.is_submodule]
 
 
 if __name__ == "__main__":
+    import argparse
     import sys
-    if len(sys.argv) > 1:
-        folder_path = sys.argv[1]
-        original_directory = os.getcwd()
+
+    parser = argparse.ArgumentParser(
+        description="Check out main, pull and discard local changes in every submodule under a folder.")
+    parser.add_argument("folder", nargs="?", default=None,
+                        help="Repository folder (default: chosen in a dialog).")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                        help=f"Repositories pulled at the same time (default: {DEFAULT_JOBS}).")
+    parser.add_argument("--no-precheck", action="store_true",
+                        help="Pull every repository, without first skipping those already "
+                             "up to date with upstream (git ls-remote).")
+    parser.add_argument("--lock-timeout", type=float, default=DEFAULT_LOCK_TIMEOUT,
+                        help="Seconds to wait for a repository another script is working in "
+                             f"(default: {DEFAULT_LOCK_TIMEOUT}).")
+    args = parser.parse_args()
+
+    if args.folder:
+        folder_path = args.folder
     else:
-        folder_path, original_directory = get_git_repository()
+        folder_path, _ = get_git_repository()
+    folder_path = os.path.abspath(folder_path)
 
     submodule_directories = find_git_directories(folder_path)
-    for submodule_directory in submodule_directories:
-        os.chdir(submodule_directory)
-        subprocess.run("git checkout main", shell=True)
-        subprocess.run("git pull", shell=True)
-        subprocess.run("git checkout .", shell=True)
-        os.chdir(original_directory)
+    results = pull_repositories(submodule_directories, args.jobs, precheck=not args.no_precheck,
+                                lock_timeout=args.lock_timeout)
+    report(results, folder_path)
+    if any(r.failed for r in results):
+        sys.exit(1)
@@ -0,0 +1,162 @@
+"""
+This module provides a concurrent pull engine for the pull scripts (pull_all_submodules, pull_folder).
+
+For each repository it runs the same sequence the scripts always ran:
+    git checkout main
+    git pull
+    git checkout .
+but with several repositories in flight at once (bounded by jobs), each command running with its
+repository as cwd (the working directory of the process is never changed) and its output captured.
+Repositories without a main branch are skipped, as pull_folder_all_submodules does.
+The results are printed as one table, with the captured output of failed repositories after it.
+
+Before pulling, a pre-check compares each repository's refs/remotes/origin/main with the upstream
+branch from 'git ls-remote' (all repositories in parallel; one ls-remote per remote URL, since many
+submodules share one). A repository is skipped when the pull sequence would not change it: upstream,
+origin/main and main point to the same commit, main is checked out and (when local changes are
+discarded) there are no local changes.
+
+The pull sequence of a repository runs under its RepoLock, so it waits for (instead of colliding with)
+another script working in the same repository; the wait is shown in the result table.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from git_supporter.git_state import branch_exists, current_branch, remote_url, resolve_ref
+from git_supporter.parallel_runner import (
+    DEFAULT_JOBS, RepoResult, format_output, print_results, run_for_repositories, run_git)
+from git_supporter.repo_lock import DEFAULT_LOCK_TIMEOUT, RepoLock, RepoLockTimeout
+
+DEFAULT_BRANCH = "main"
+LS_REMOTE_TIMEOUT = 60
+UP_TO_DATE = "up-to-date"
+
+
+def _head(path: str) -> str:
+    result = run_git(["rev-parse", "--short", "HEAD"], cwd=path)
+    return result.stdout.strip() if result.returncode == 0 else ""
+
+
+def pull_repository(path: str, branch: str = DEFAULT_BRANCH, discard_changes: bool = True,
+                    lock_timeout: Optional[float] = DEFAULT_LOCK_TIMEOUT) -> RepoResult:
+    """Check out branch, pull it and (optionally) discard local changes, in one repository."""
+    name = os.path.basename(os.path.normpath(path))
+    # Repositories without the branch are left alone, as in pull_folder_all_submodules
+    if not branch_exists(path, branch):
+        return RepoResult(name, path, "skipped", detail=f"no {branch} branch")
+    lock = RepoLock(path, "pull", timeout=lock_timeout)
+    try:
+        lock.acquire()
+    except RepoLockTimeout as e:
+        return RepoResult(name, path, "failed", detail="repository is locked", output=str(e))
+    try:
+        result = _pull_steps(name, path, branch, discard_changes)
+    finally:
+        lock.release()
+    if lock.waited >= 0.1:
+        result.detail += f" (waited {lock.waited:.1f}s for lock)"
+    return result
+
+
+def _pull_steps(name: str, path: str, branch: str, discard_changes: bool) -> RepoResult:
+    before = _head(path)
+    outputs = []
+    steps = [["checkout", branch], ["pull"]]
+    if discard_changes:
+        steps.append(["checkout", "."])
+    for args in steps:
+        result = run_git(args, cwd=path)
+        outputs.append(format_output(result))
+        if result.returncode != 0:
+            return RepoResult(name, path, "failed", detail=f"git {' '.join(args)} failed",
+                              output="\n".join(outputs))
+    after = _head(path)
+    detail = f"{before}..{after}" if before != after else "already up to date"
+    return RepoResult(name, path, "ok", detail=detail, output="\n".join(outputs))
+
+
+class RemoteHeads:
+    """Upstream branch heads from 'git ls-remote', looked up once per (remote URL, branch)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._heads: Dict[Tuple[str, str], Optional[str]] = {}
+
+    def head(self, url: str, branch: str, cwd: str) -> Optional[str]:
+        key = (url, branch)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._heads:
+                result = run_git(["ls-remote", url, f"refs/heads/{branch}"], cwd=cwd,
+                                 timeout=LS_REMOTE_TIMEOUT)
+                fields = result.stdout.split()
+                self._heads[key] = fields[0] if result.returncode == 0 and fields else None
+            return self._heads[key]
+
+
+def check_up_to_date(path: str, remote_heads: RemoteHeads, branch: str = DEFAULT_BRANCH,
+                     discard_changes: bool = True) -> RepoResult:
+    """Status UP_TO_DATE if pulling path would change nothing, "behind" otherwise."""
+    name = os.path.basename(os.path.normpath(path))
+    # Read from .git directly: no process per repository for the local side
+    url = remote_url(path, "origin")
+    if url is None:
+        return RepoResult(name, path, "behind", detail="no origin remote")
+    tracking = resolve_ref(path, f"refs/remotes/origin/{branch}")
+    local = resolve_ref(path, f"refs/heads/{branch}")
+    if tracking is None or local is None:
+        return RepoResult(name, path, "behind", detail=f"origin/{branch} or {branch} not found")
+
+    upstream = remote_heads.head(url, branch, path)
+    if upstream is None:
+        return RepoResult(name, path, "behind", detail="ls-remote failed")
+    if upstream != tracking:
+        return RepoResult(name, path, "behind", detail=f"origin/{branch} {tracking[:7]} -> {upstream[:7]}")
+    if local != tracking or current_branch(path) != branch:
+        return RepoResult(name, path, "behind", detail=f"{branch} not checked out at origin/{branch}")
+    if discard_changes and run_git(["diff", "--quiet", "HEAD"], cwd=path).returncode != 0:
+        return RepoResult(name, path, "behind", detail="local changes to discard")
+    return RepoResult(name, path, UP_TO_DATE, detail=f"{tracking[:7]} matches upstream")
+
+
+def pull_repositories(paths: List[str], jobs: int = DEFAULT_JOBS, branch: str = DEFAULT_BRANCH,
+                      discard_changes: bool = True, precheck: bool = True,
+                      lock_timeout: Optional[float] = DEFAULT_LOCK_TIMEOUT) -> List[RepoResult]:
+    """
+    Pull every repository of paths, up to jobs at a time; results are in the order of paths.
+    With precheck, repositories already up to date with upstream are skipped (status UP_TO_DATE).
+    A repository whose lock is not acquired within lock_timeout seconds fails.
+    """
+    pull = partial(pull_repository, branch=branch, discard_changes=discard_changes,
+                   lock_timeout=lock_timeout)
+    if not precheck:
+        return run_for_repositories(pull, paths, jobs)
+
+    check = partial(check_up_to_date, remote_heads=RemoteHeads(), branch=branch,
+                    discard_changes=discard_changes)
+    checks = run_for_repositories(check, paths, jobs, progress=False)
+    to_pull = [c.path for c in checks if c.status != UP_TO_DATE]
+    skipped = len(paths) - len(to_pull)
+    print(f"[INFO] Pre-check: {skipped} of {len(paths)} repositories up to date, skipped "
+          f"({sum(c.seconds for c in checks):.1f}s of checks).", file=sys.stderr)
+
+    pulled = iter(run_for_repositories(pull, to_pull, jobs) if to_pull else [])
+    return [c if c.status == UP_TO_DATE else next(pulled) for c in checks]
+
+
+def report(results: List[RepoResult], root: str) -> None:
+    """Print the result table with repositories named relative to root."""
+    for r in results:
+        rel = os.path.relpath(r.path, root)
+        r.name = os.path.basename(root.rstrip(os.sep)) if rel == "." else rel
+    print_results(results, f"Pull under {root}")
@@ -3,6 +3,10 @@ This module provides functionality to search for Git repositories within a speci
 It defines a function to recursively traverse directories and identify those containing a '.git' folder,
 indicating the presence of a Git repository.
 
+When run as a script, every repository found is pulled concurrently (--jobs) by pull_engine,
+ without changing the working directory, and the results are printed as one table.
+ Repositories already up to date with upstream are skipped after a 'git ls-remote' pre-check.
+
 Classes:
     None
 
@@ -12,8 +16,9 @@ Functions:
 """
 
 import os
-import subprocess
 from find_git_repository import find_git_repository
+from repo_discovery import discover_repositories
+from pull_engine import DEFAULT_JOBS, DEFAULT_LOCK_TIMEOUT, pull_repositories, report
 
 
 def find_git_directories(root_dir):
@@ -24,24 +29,34 @@ def find_git_directories(root_dir):
         root_dir (str): The root directory to start searching from.
 
     Returns:
-        list: A list of directory paths that contain a '.git' directory, indicating a Git repository.
+        list: A list of submodule checkouts (directories with a '.git' file), found by repo_discovery.
     """
-    git_dirs = []
-    for dirpath, dirnames, filenames in os.walk(root_dir):
-        if '.git' in filenames:
-            git_dirs.append(dirpath)
-    return git_dirs
+    return [checkout.path for checkout in discover_repositories(root_dir)
+            if checkout.is_submodule]
 
 
 if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(
+        description="Check out main, pull and discard local changes in every repository of a folder.")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                        help=f"Repositories pulled at the same time (default: {DEFAULT_JOBS}).")
+    parser.add_argument("--no-precheck", action="store_true",
+                        help="Pull every repository, without first skipping those already "
+                             "up to date with upstream (git ls-remote).")
+    parser.add_argument("--lock-timeout", type=float, default=DEFAULT_LOCK_TIMEOUT,
+                        help="Seconds to wait for a repository another script is working in "
+                             f"(default: {DEFAULT_LOCK_TIMEOUT}).")
+    args = parser.parse_args()
 
     git_directories = find_git_repository()
-
-    original_directory = os.getcwd()
-
-    for git_directory in git_directories:
-        os.chdir(git_directory)
-        subprocess.run("git checkout main", shell=True)
-        subprocess.run("git pull", shell=True)
-        subprocess.run("git checkout .", shell=True)
-        os.chdir(original_directory)
+    if not git_directories:
+        sys.exit(0)
+
+    results = pull_repositories(git_directories, args.jobs, precheck=not args.no_precheck,
+                                lock_timeout=args.lock_timeout)
+    report(results, os.path.dirname(os.path.abspath(git_directories[0])))
+    if any(r.failed for r in results):
+        sys.exit(1)
@@ -9,6 +9,8 @@ Functions:
     within the specified repository.
     pull_repo_and_submodules(repo_dir, original_directory): Executes 'git pull' and
     related commands for the specified repository and its submodules.
+    pull_main(path): Pulls 'main' in one checkout while holding its RepoLock, so that other
+    scripts (the nightly submodule update, ...) do not run git in it at the same time.
 
 Classes:
     (No classes are defined in this module.)
@@ -16,7 +18,11 @@ Classes:
 
 import os
 import subprocess
+import sys
 from find_git_repository import find_git_repository
+from git_state import branch_exists
+from repo_discovery import discover_repositories, parse_gitmodules
+from repo_lock import RepoLock, RepoLockTimeout
 
 
 def find_git_directories(root_dir):
@@ -27,13 +33,8 @@ def find_git_directories(root_dir):
 
     list: A list of directories that contain a .git directory.
     """
-    git_dirs = []
-    for dirpath, dirnames, filenames in os.walk(root_dir):
-        if '.git' in dirnames:
-            git_dirs.append(dirpath)
-            # do not search deeper in this directory
-            dirnames[:] = []
-    return git_dirs
+    return [checkout.path for checkout in discover_repositories(root_dir, nested=False)
+            if not checkout.is_submodule]
 
 
 def find_submodule_directories(repo_dir):
@@ -44,23 +45,15 @@ def find_submodule_directories(repo_dir):
 
     list: A list of submodule directory paths found in the repository.
 
-    This function reads the `.gitmodules` file in the given repository directory,
-    parses the paths of all submodules, and returns a list of their absolute paths
+    This function parses the `.gitmodules` file in the given repository directory
+    (repo_discovery.parse_gitmodules) for the paths of all submodules, and returns a list of their absolute paths
     if the directories exist.
     """
     submodules = []
-    gitmodules_path = os.path.join(repo_dir, '.gitmodules')
-    if not os.path.isfile(gitmodules_path):
-        return submodules
-
-    with open(gitmodules_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if line.startswith('path ='):
-                sub_path = line.split('=', 1)[1].strip()
-                submodule_dir = os.path.join(repo_dir, sub_path)
-                if os.path.isdir(submodule_dir):
-                    submodules.append(submodule_dir)
+    for _, sub_path, _ in parse_gitmodules(repo_dir):
+        submodule_dir = os.path.join(repo_dir, sub_path)
+        if os.path.isdir(submodule_dir):
+            submodules.append(submodule_dir)
     return submodules
 
 
@@ -79,25 +72,27 @@ def pull_repo_and_submodules(repo_dir, original_directory):
         FileNotFoundError: If the specified repository or submodule directories do not exist.
         subprocess.CalledProcessError: If any git command fails during execution.
     """
-    os.chdir(repo_dir)
-    # check if the main branch exists and pull changes
-    result = subprocess.run("git branch --list main",
-                            shell=True, capture_output=True, text=True)
-    if result.stdout.strip():
-        subprocess.run("git checkout main", shell=True)
-        subprocess.run("git pull", shell=True)
-        subprocess.run("git checkout .", shell=True)
+    # check if the main branch exists (read from .git, no process) and pull changes
+    pull_main(repo_dir)
 
     submodules = find_submodule_directories(repo_dir)
     for submodule_dir in submodules:
-        os.chdir(submodule_dir)
-        result = subprocess.run("git branch --list main",
-                                shell=True, capture_output=True, text=True)
-        if result.stdout.strip():
+        pull_main(submodule_dir)
+    os.chdir(original_directory)
+
+
+def pull_main(path):
+    """Check out main, pull and discard local changes in path, holding its RepoLock."""
+    if not branch_exists(path, "main"):
+        return
+    try:
+        with RepoLock(path, "pull_folder_all_submodules"):
+            os.chdir(path)
             subprocess.run("git checkout main", shell=True)
             subprocess.run("git pull", shell=True)
             subprocess.run("git checkout .", shell=True)
-    os.chdir(original_directory)
+    except RepoLockTimeout as e:
+        print(f"[WARN] Skipped {path}: {e}", file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,253 @@
+"""
+This module provides one repository discovery for all git_supporter scripts.
+
+- Folders outside any repository are walked with os.scandir. A folder containing a '.git' entry is a
+  checkout: a '.git' directory is a repository, a '.git' file ("gitdir: ...") is a submodule (or a
+  linked worktree). The working tree of a checkout is never walked.
+- Submodules are found by parsing the checkout's .gitmodules (without starting git), recursively.
+- The result is kept in a workspace manifest (one JSON file per root and options under
+  ~/.cache/MCAP_repo_manager). It records the mtime of every folder that was listed and of every
+  .gitmodules read; a repeat run only stats those paths and reuses the manifest while none changed.
+  Adding or removing a repository or submodule changes the mtime of its parent folder, so it is
+  always noticed.
+
+Functions:
+    discover_repositories(root, max_depth, nested, use_manifest): Returns the checkouts under root.
+    child_checkouts(root): Returns the checkouts among root's immediate subfolders (never root itself).
+    parse_gitmodules(repo_path): Returns the (name, path, url) of each submodule declared in .gitmodules.
+    read_gitdir(path): Returns the git directory of a checkout, following '.git' files.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+MANIFEST_VERSION = 1
+MANIFEST_DIR = os.path.join(os.path.expanduser("~"), ".cache", "MCAP_repo_manager")
+PRUNE_NAMES = {".git", "__pycache__", "node_modules", ".venv", "venv"}
+
+
+class GitCheckout:
+    """A repository or submodule checkout found under the discovery root."""
+
+    def __init__(self, path: str, is_submodule: bool, gitdir: Optional[str],
+                 parent: Optional[str] = None):
+        self.path = path
+        # True when '.git' is a file pointing elsewhere (submodule or linked worktree)
+        self.is_submodule = is_submodule
+        self.gitdir = gitdir
+        # Checkout declaring this one in its .gitmodules, None for top-level repositories
+        self.parent = parent
+
+    def as_dict(self) -> dict:
+        return {"path": self.path, "is_submodule": self.is_submodule,
+                "gitdir": self.gitdir, "parent": self.parent}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "GitCheckout":
+        return cls(d["path"], d["is_submodule"], d["gitdir"], d.get("parent"))
+
+    def __repr__(self) -> str:
+        return f"GitCheckout({self.path!r}, is_submodule={self.is_submodule})"
+
+
+def read_gitdir(path: str) -> Optional[str]:
+    """Git directory of the checkout at path ('.git' directory, or the target of a '.git' file)."""
+    dot_git = os.path.join(path, ".git")
+    if os.path.isdir(dot_git):
+        return dot_git
+    try:
+        with open(dot_git, "r", encoding="utf-8") as f:
+            line = f.readline().strip()
+    except OSError:
+        return None
+    if not line.startswith("gitdir:"):
+        return None
+    target = line[len("gitdir:"):].strip()
+    return os.path.normpath(os.path.join(path, target))
+
+
+def parse_gitmodules(repo_path: str) -> List[Tuple[str, str, str]]:
+    """(name, path, url) of each submodule declared in repo_path/.gitmodules, in file order."""
+    gitmodules_path = os.path.join(repo_path, ".gitmodules")
+    try:
+        with open(gitmodules_path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+    except OSError:
+        return []
+
+    entries: Dict[str, Dict[str, str]] = {}
+    current: Optional[Dict[str, str]] = None
+    for line in lines:
+        line = line.strip()
+        if not line or line[0] in "#;":
+            continue
+        if line.startswith("["):
+            # [submodule "name"]
+            header = line.strip("[]").strip()
+            if header.startswith("submodule"):
+                name = header[len("submodule"):].strip().strip('"')
+                current = entries.setdefault(name, {})
+            else:
+                current = None
+            continue
+        if current is not None and "=" in line:
+            key, value = line.split("=", 1)
+            current[key.strip().lower()] = value.strip().strip('"')
+    return [(name, e["path"], e.get("url", "")) for name, e in entries.items() if "path" in e]
+
+
+def _stamp(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _add_submodules(checkout: GitCheckout, checkouts: List[GitCheckout],
+                    stamps: Dict[str, Optional[int]]) -> None:
+    repo_path = checkout.path
+    stamps[repo_path] = _stamp(repo_path)
+    stamps[os.path.join(repo_path, ".gitmodules")] = _stamp(os.path.join(repo_path, ".gitmodules"))
+    for _, sub_path, _ in parse_gitmodules(repo_path):
+        full_path = os.path.normpath(os.path.join(repo_path, sub_path))
+        # Initializing a submodule creates its '.git' file and changes this mtime
+        stamps[full_path] = _stamp(full_path)
+        if not os.path.exists(os.path.join(full_path, ".git")):
+            continue
+        sub = GitCheckout(full_path, not os.path.isdir(os.path.join(full_path, ".git")),
+                          read_gitdir(full_path), parent=repo_path)
+        checkouts.append(sub)
+        _add_submodules(sub, checkouts, stamps)
+
+
+def _scan(root: str, max_depth: Optional[int], nested: bool) -> Tuple[List[GitCheckout], Dict[str, Optional[int]]]:
+    checkouts: List[GitCheckout] = []
+    stamps: Dict[str, Optional[int]] = {}
+    stack: List[Tuple[str, int]] = [(root, 0)]
+    while stack:
+        folder, depth = stack.pop()
+        try:
+            with os.scandir(folder) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        stamps[folder] = _stamp(folder)
+
+        dot_git = next((e for e in entries if e.name == ".git"), None)
+        if dot_git is not None:
+            checkout = GitCheckout(folder, not dot_git.is_dir(), read_gitdir(folder))
+            checkouts.append(checkout)
+            if nested:
+                _add_submodules(checkout, checkouts, stamps)
+            # Never walk a working tree
+            continue
+
+        if max_depth is not None and depth >= max_depth:
+            continue
+        subdirs = [e.path for e in entries
+                   if e.name not in PRUNE_NAMES and e.is_dir(follow_symlinks=False)]
+        stack.extend((d, depth + 1) for d in reversed(subdirs))
+    return checkouts, stamps
+
+
+def _manifest_path(root: str, max_depth: Optional[int], nested: bool) -> str:
+    key = json.dumps([root, max_depth, nested])
+    return os.path.join(MANIFEST_DIR, f"repositories-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}.json")
+
+
+def _load_manifest(path: str) -> Optional[List[GitCheckout]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    for stamped_path, mtime in manifest["stamps"].items():
+        if _stamp(stamped_path) != mtime:
+            return None
+    return [GitCheckout.from_dict(d) for d in manifest["checkouts"]]
+
+
+def _save_manifest(path: str, root: str, checkouts: List[GitCheckout],
+                   stamps: Dict[str, Optional[int]]) -> None:
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "root": root, "stamps": stamps,
+                       "checkouts": [c.as_dict() for c in checkouts]}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"[WARN] Failed to write the repository manifest {path}: {e}", file=sys.stderr)
+
+
+def discover_repositories(root: str, max_depth: Optional[int] = None, nested: bool = True,
+                          use_manifest: bool = True) -> List[GitCheckout]:
+    """
+    Checkouts under root, parents before their submodules.
+
+    max_depth limits how many folder levels below root are searched for repositories
+    (1 = root's children). With nested, the submodules declared in each checkout's
+    .gitmodules are included (recursively) when they are checked out.
+    With use_manifest, the previous result is reused while no recorded folder changed.
+    """
+    root = os.path.abspath(root)
+    manifest_path = _manifest_path(root, max_depth, nested)
+    if use_manifest:
+        checkouts = _load_manifest(manifest_path)
+        if checkouts is not None:
+            return checkouts
+    checkouts, stamps = _scan(root, max_depth, nested)
+    if use_manifest:
+        _save_manifest(manifest_path, root, checkouts, stamps)
+    return checkouts
+
+
+def child_checkouts(root: str) -> List[GitCheckout]:
+    """
+    Checkouts among the immediate subfolders of root, sorted by name. Unlike
+    discover_repositories(root, max_depth=1), root itself is never returned, even
+    when it is a repository: scripts run on "a folder of repositories" act on its children.
+    """
+    checkouts: List[GitCheckout] = []
+    try:
+        with os.scandir(root) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return checkouts
+    for entry in entries:
+        if not entry.is_dir():
+            continue
+        dot_git = os.path.join(entry.path, ".git")
+        if os.path.exists(dot_git):
+            checkouts.append(GitCheckout(entry.path, not os.path.isdir(dot_git),
+                                         read_gitdir(entry.path)))
+    return checkouts
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="List the git checkouts under a folder.")
+    parser.add_argument("folder", help="Folder to search.")
+    parser.add_argument("--max-depth", type=int, default=None,
+                        help="Folder levels below the folder searched for repositories (default: no limit).")
+    parser.add_argument("--no-submodules", action="store_true", help="Do not list submodules.")
+    parser.add_argument("--no-manifest", action="store_true", help="Ignore and do not write the manifest.")
+    args = parser.parse_args()
+
+    for checkout in discover_repositories(args.folder, args.max_depth, not args.no_submodules,
+                                          not args.no_manifest):
+        print(f"{'submodule ' if checkout.is_submodule else 'repository'}  {checkout.path}")
+
+
+if __name__ == "__main__":
+    main()
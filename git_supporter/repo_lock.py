@@ -0,0 +1,193 @@
+"""
+This module provides per-repository locks shared by all scripts and processes of one user, so that a
+pull started by hand and the nightly submodule update do not run git in the same repository at the
+same time (and fail on index.lock).
+
+- Each repository has its own lock file under ~/.cache/MCAP_repo_manager/locks (named after the
+  repository's real path), locked with fcntl.flock (POSIX) or msvcrt.locking (Windows). Operations on
+  different repositories never wait for each other; operations on the same repository run one at a time.
+- Waiting operations block on the lock (a blocking flock, queued by the kernel) until it is free or
+  their timeout expires (RepoLockTimeout); a waiter gets the lock as soon as it is released. When
+  several processes wait, the kernel picks the next holder, so the order is not strictly FIFO.
+  On Windows, waiters poll every POLL_INTERVAL seconds instead.
+  The holder writes its pid, host and operation into the lock file, so a timeout names who held it.
+- The time each operation waited for its lock is kept in RepoLock.waited and reported on stderr
+  when it is noticeable.
+- The locks are released by the operating system when the holding process exits, so a crashed
+  script never leaves a repository locked.
+
+Usage:
+        with RepoLock(repo_path, "pull", timeout=600) as lock:
+            ...  # git commands in repo_path
+        print(lock.waited)
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+LOCK_DIR = os.path.join(os.path.expanduser("~"), ".cache", "MCAP_repo_manager", "locks")
+DEFAULT_LOCK_TIMEOUT = 1800
+# Waits shorter than this are not reported
+REPORT_WAIT_THRESHOLD = 1.0
+# Windows only: msvcrt.locking cannot block without a retry limit
+POLL_INTERVAL = 0.05
+
+
+class RepoLockTimeout(TimeoutError):
+    """The lock of a repository was not acquired within the timeout."""
+
+
+def lock_file_path(repo_path: str, lock_dir: str = LOCK_DIR) -> str:
+    real_path = os.path.normcase(os.path.realpath(repo_path))
+    digest = hashlib.sha1(real_path.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(lock_dir, f"{os.path.basename(real_path)}-{digest}.lock")
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        if os.name == "nt":
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fd: int) -> None:
+    if os.name == "nt":
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class RepoLock:
+    """Exclusive lock on one repository, usable as a context manager."""
+
+    def __init__(self, repo_path: str, operation: str = "",
+                 timeout: Optional[float] = DEFAULT_LOCK_TIMEOUT, lock_dir: str = LOCK_DIR):
+        self.repo_path = repo_path
+        self.operation = operation
+        # None waits forever, 0 fails at once when the repository is busy
+        self.timeout = timeout
+        self.path = lock_file_path(repo_path, lock_dir)
+        self.waited = 0.0
+        self._fd: Optional[int] = None
+
+    def holder(self) -> str:
+        """Description of the current holder, from the lock file."""
+        try:
+            with open(self.path, "rb") as f:
+                # Skip byte 0: it is the locked region on Windows, and reading it fails there
+                f.seek(1)
+                info = json.loads(f.read().decode("utf-8") or "{}")
+        except (OSError, ValueError):
+            return "unknown holder"
+        return (f"pid {info.get('pid')} on {info.get('host')} "
+                f"({info.get('operation') or 'unnamed operation'} since {info.get('since')})")
+
+    def acquire(self) -> float:
+        """Wait for the lock; returns the seconds waited. Raises RepoLockTimeout."""
+        if self._fd is not None:
+            raise RuntimeError(f"lock of {self.repo_path} is already held")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        start = time.monotonic()
+        if not _try_lock(fd):
+            if self.timeout == 0:
+                os.close(fd)
+                self._raise_timeout()
+            if os.name == "nt":
+                self._poll_lock(fd, start)
+            elif self.timeout is None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                self._wait_lock(fd)
+        self._fd = fd
+        self.waited = time.monotonic() - start
+
+        # Byte 0 is the locked region on Windows; the holder description follows it
+        info = {"pid": os.getpid(), "host": socket.gethostname(), "operation": self.operation,
+                "since": datetime.now().isoformat(timespec="seconds")}
+        os.ftruncate(fd, 1)
+        os.lseek(fd, 1, os.SEEK_SET)
+        os.write(fd, json.dumps(info).encode("utf-8"))
+
+        if self.waited >= REPORT_WAIT_THRESHOLD:
+            print(f"[INFO] Waited {self.waited:.1f}s for the lock of {self.repo_path}"
+                  f"{f' ({self.operation})' if self.operation else ''}.", file=sys.stderr)
+        return self.waited
+
+    def _raise_timeout(self) -> None:
+        raise RepoLockTimeout(f"lock of {self.repo_path} not acquired within {self.timeout}s, "
+                              f"held by {self.holder()}")
+
+    def _wait_lock(self, fd: int) -> None:
+        """
+        Blocking flock in a helper thread, so the wait has a deadline. The waiter is queued in
+        the kernel and gets the lock as soon as it is released. After a timeout the thread stays
+        queued and releases the lock at once when it gets it.
+        """
+        acquired = threading.Event()
+        guard = threading.Lock()
+        abandoned = []
+
+        def wait() -> None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            with guard:
+                if abandoned:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                    os.close(fd)
+                else:
+                    acquired.set()
+
+        threading.Thread(target=wait, daemon=True).start()
+        if acquired.wait(self.timeout):
+            return
+        with guard:
+            if acquired.is_set():
+                return
+            abandoned.append(True)
+        self._raise_timeout()
+
+    def _poll_lock(self, fd: int, start: float) -> None:
+        """msvcrt has no blocking lock without a retry limit: poll at a short fixed interval."""
+        while not _try_lock(fd):
+            if self.timeout is not None and time.monotonic() - start >= self.timeout:
+                os.close(fd)
+                self._raise_timeout()
+            time.sleep(POLL_INTERVAL)
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        try:
+            _unlock(self._fd)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> "RepoLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
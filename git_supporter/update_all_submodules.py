@@ -2,33 +2,95 @@ from __future__ import annotations
 
 import os
 import sys
+from functools import partial
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 import argparse
-import subprocess
 import tkinter as tk
 from tkinter import filedialog
 
+from git_supporter.mirror_store import DEFAULT_STORE, MirrorStore
+from git_supporter.parallel_runner import (
+    DEFAULT_JOBS, RepoResult, format_output, print_results, run_for_repositories, run_git)
+from git_supporter.repo_lock import RepoLock, RepoLockTimeout
 from parameter.MCAP_info import MCAP_info
 
+DEFAULT_SUBMODULE_JOBS = 8
+
+
+def update_submodules(path, submodule_jobs=DEFAULT_SUBMODULE_JOBS, mirror_store=None):
+    """
+    Run 'git submodule update --init --jobs N' in one repository (as cwd, without changing
+    the working directory of this process).
+    """
+    name = os.path.basename(path)
+    if not os.path.isdir(path):
+        return RepoResult(name, path, "skipped", detail="repository folder not found")
+
+    try:
+        with RepoLock(path, "update_all_submodules"):
+            return _update_submodules(name, path, submodule_jobs, mirror_store)
+    except RepoLockTimeout as e:
+        return RepoResult(name, path, "failed", detail="repository is locked", output=str(e))
+
+
+def _update_submodules(name, path, submodule_jobs, mirror_store):
+    if mirror_store is not None:
+        ok, output = mirror_store.update_submodules(path, recursive=False)
+        if not ok:
+            return RepoResult(name, path, "failed", detail="submodule update failed", output=output)
+        return RepoResult(name, path, "ok", detail="updated through mirrors")
+
+    result = run_git(["submodule", "update", "--init", "--jobs", str(submodule_jobs)], cwd=path)
+    if result.returncode != 0:
+        return RepoResult(name, path, "failed", detail="submodule update failed",
+                          output=format_output(result))
+    updated = sum(1 for line in (result.stdout + result.stderr).splitlines()
+                  if line.startswith("Submodule path"))
+    return RepoResult(name, path, "ok", detail=f"{updated} submodules checked out")
+
 
 def main():
     """
     This script provides a command-line utility to update all git submodules for repositories listed in the MCAP_info configuration.
     It allows the user to specify a target folder via a command-line argument or a GUI folder selection dialog.
-    For each repository directory specified in MCAP_info.repository_list, the script navigates to the directory and runs
-    'git submodule update --progress --init' to initialize and update all submodules.
+    For each repository directory specified in MCAP_info.repository_list, the script runs
+    'git submodule update --init --jobs N' to initialize and update all submodules.
+    Repositories are handled concurrently (--jobs), each git command running in its repository directory,
+    so the working directory of this process is never changed. Timings and failures are reported at the end.
+    With --mirror-store, the local bare mirrors are refreshed first and each submodule is initialized with
+    '--reference' to the mirror of its repository (see mirror_store.py).
     """
     parser = argparse.ArgumentParser(
-        description="Clone repositories listed in MCAP_info.")
+        description="Update the submodules of the repositories listed in MCAP_info.")
     parser.add_argument(
         "--folder",
         type=str,
-        help="Path to the folder where repositories will be cloned.",
+        help="Path to the folder where repositories are cloned.",
         required=False
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Repositories updated at the same time (default: {DEFAULT_JOBS})."
+    )
+    parser.add_argument(
+        "--submodule-jobs",
+        type=int,
+        default=DEFAULT_SUBMODULE_JOBS,
+        help=f"Submodules fetched in parallel inside each repository (default: {DEFAULT_SUBMODULE_JOBS})."
+    )
+    parser.add_argument(
+        "--mirror-store",
+        nargs="?",
+        const=DEFAULT_STORE,
+        default=None,
+        metavar="DIR",
+        help=f"Initialize submodules through local bare mirrors (default folder: {DEFAULT_STORE})."
+    )
     args = parser.parse_args()
 
     folder_path = args.folder
@@ -42,16 +104,24 @@ def main():
     if not folder_path:
         raise ValueError("Folder is not selected.")
 
-    repo_directories = list(MCAP_info.repository_list.keys())
+    folder_path = os.path.abspath(folder_path)
+    repo_paths = [os.path.join(folder_path, directory)
+                  for directory in MCAP_info.repository_list.keys()]
+
+    mirror_store = None
+    if args.mirror_store:
+        mirror_store = MirrorStore(args.mirror_store)
+        print_results(mirror_store.refresh_all(MCAP_info.repository_list, args.jobs),
+                      f"Mirror store {mirror_store.store_dir}")
 
-    os.chdir(folder_path)
-    original_directory = os.getcwd()
+    update = partial(update_submodules,
+                     submodule_jobs=args.submodule_jobs,
+                     mirror_store=mirror_store)
+    results = run_for_repositories(update, repo_paths, args.jobs)
+    print_results(results, f"Submodule update in {folder_path}")
 
-    for i, directory in enumerate(repo_directories):
-        path = os.path.join(original_directory, directory)
-        os.chdir(path)
-        subprocess.run("git submodule update --progress --init", shell=True)
-        os.chdir(original_directory)
+    if any(r.failed for r in results):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,200 @@
+"""
+This script shows, before any bulk operation, which repositories and submodules of a workspace are
+dirty, ahead, behind or detached.
+
+- Every checkout under the folder (repositories and their submodules, see repo_discovery) is queried
+  with 'git status --porcelain=v2 --branch -z', several at a time (--jobs).
+- --untracked-cache and --fsmonitor turn on core.untrackedCache / core.fsmonitor in each checkout,
+  which makes later status runs faster on large working trees (fsmonitor needs git's built-in
+  daemon, available on Windows and macOS).
+- The result is printed as a compact table, or with --json as a JSON list that other scripts can read
+  (collect_status returns the same data in Python).
+
+Usage:
+        python workspace_status.py [--folder /path/to/workspace] [--jobs N] [--json]
+                                   [--untracked-cache] [--fsmonitor]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from functools import partial
+from pathlib import Path
+from typing import List
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from git_supporter.parallel_runner import (
+    DEFAULT_JOBS, RepoResult, format_output, run_for_repositories, run_git)
+from git_supporter.repo_discovery import discover_repositories
+
+
+class RepoStatus(RepoResult):
+    """RepoResult with the branch and working tree state of one checkout."""
+
+    def __init__(self, name: str, path: str):
+        super().__init__(name, path, status="clean")
+        self.branch = None
+        self.upstream = None
+        self.oid = None
+        self.ahead = 0
+        self.behind = 0
+        self.staged = 0
+        self.modified = 0
+        self.untracked = 0
+        self.conflicts = 0
+
+    @property
+    def detached(self) -> bool:
+        return self.branch is None
+
+    def as_dict(self) -> dict:
+        d = super().as_dict()
+        d.update({"branch": self.branch, "detached": self.detached, "upstream": self.upstream,
+                  "oid": self.oid, "ahead": self.ahead, "behind": self.behind,
+                  "staged": self.staged, "modified": self.modified,
+                  "untracked": self.untracked, "conflicts": self.conflicts})
+        return d
+
+
+def parse_porcelain_v2(output: str, status: RepoStatus) -> None:
+    """Fill status from the output of 'git status --porcelain=v2 --branch -z'."""
+    records = output.split("\0")
+    i = 0
+    while i < len(records):
+        record = records[i]
+        i += 1
+        if not record:
+            continue
+        if record.startswith("# "):
+            key, _, value = record[2:].partition(" ")
+            if key == "branch.oid":
+                status.oid = None if value == "(initial)" else value
+            elif key == "branch.head":
+                status.branch = None if value == "(detached)" else value
+            elif key == "branch.upstream":
+                status.upstream = value
+            elif key == "branch.ab":
+                ahead, behind = value.split()
+                status.ahead, status.behind = int(ahead), -int(behind)
+        elif record[0] in "12":
+            xy = record[2:4]
+            if xy[0] != ".":
+                status.staged += 1
+            if xy[1] != ".":
+                status.modified += 1
+            if record[0] == "2":
+                i += 1  # a rename or copy is followed by its original path
+        elif record[0] == "u":
+            status.conflicts += 1
+        elif record[0] == "?":
+            status.untracked += 1
+
+
+def repository_status(path: str, root: str, untracked_cache: bool = False,
+                      fsmonitor: bool = False) -> RepoStatus:
+    rel = os.path.relpath(path, root)
+    status = RepoStatus(os.path.basename(root) if rel == "." else rel, path)
+    # Always a RepoStatus, so the table never meets a plain RepoResult
+    try:
+        if untracked_cache:
+            run_git(["config", "core.untrackedCache", "true"], cwd=path)
+        if fsmonitor:
+            run_git(["config", "core.fsmonitor", "true"], cwd=path)
+        result = run_git(["status", "--porcelain=v2", "--branch", "-z"], cwd=path)
+        if result.returncode != 0:
+            status.status = "failed"
+            status.detail = "git status failed"
+            status.output = format_output(result)
+            return status
+        parse_porcelain_v2(result.stdout, status)
+    except Exception as e:
+        status.status = "failed"
+        status.detail = str(e)
+        status.output = str(e)
+        return status
+
+    states = []
+    if status.detached:
+        states.append("detached")
+    if status.conflicts:
+        states.append("conflict")
+    if status.staged or status.modified or status.untracked:
+        states.append("dirty")
+    if status.ahead:
+        states.append("ahead")
+    if status.behind:
+        states.append("behind")
+    status.status = ",".join(states) or "clean"
+    return status
+
+
+def collect_status(root: str, jobs: int = DEFAULT_JOBS, untracked_cache: bool = False,
+                   fsmonitor: bool = False) -> List[RepoStatus]:
+    """Status of every checkout under root, parents before their submodules."""
+    root = os.path.abspath(root)
+    paths = [checkout.path for checkout in discover_repositories(root)]
+    query = partial(repository_status, root=root, untracked_cache=untracked_cache,
+                    fsmonitor=fsmonitor)
+    return run_for_repositories(query, paths, jobs, progress=False)
+
+
+def print_status_table(statuses: List[RepoStatus]) -> None:
+    width = max([len(s.name) for s in statuses] + [10])
+    print(f"{'repository':{width}s} {'branch':16s} {'ahead':>5s} {'behind':>6s} {'staged':>6s} "
+          f"{'modif':>5s} {'untrk':>5s} {'confl':>5s}  state")
+    for s in statuses:
+        branch = "-" if s.failed else s.branch or f"({(s.oid or '')[:7]})"
+        print(f"{s.name:{width}s} {branch:16s} {s.ahead:5d} {s.behind:6d} {s.staged:6d} "
+              f"{s.modified:5d} {s.untracked:5d} {s.conflicts:5d}  {s.status}")
+
+    clean = sum(1 for s in statuses if s.status == "clean")
+    print(f"# {clean} clean, {len(statuses) - clean} need attention ({len(statuses)} checkouts)")
+    for s in statuses:
+        if s.failed:
+            print(f"\n[ERROR] {s.name} ({s.path}):\n{s.output.rstrip()}", file=sys.stderr)
+
+
+def _select_folder_via_gui():
+    import tkinter as tk
+    from tkinter import filedialog
+
+    root = tk.Tk()
+    root.withdraw()
+    return filedialog.askdirectory() or None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Show branch and working tree state of every repository and submodule in a folder.")
+    parser.add_argument("--folder", type=str, default=None,
+                        help="Workspace folder (default: chosen in a dialog).")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                        help=f"Checkouts queried at the same time (default: {DEFAULT_JOBS}).")
+    parser.add_argument("--json", action="store_true",
+                        help="Print the status as JSON instead of a table.")
+    parser.add_argument("--untracked-cache", action="store_true",
+                        help="Enable core.untrackedCache in every checkout (speeds up later runs).")
+    parser.add_argument("--fsmonitor", action="store_true",
+                        help="Enable core.fsmonitor in every checkout (Windows and macOS).")
+    args = parser.parse_args()
+
+    folder_path = args.folder or _select_folder_via_gui()
+    if not folder_path:
+        raise ValueError("Folder is not selected.")
+
+    statuses = collect_status(folder_path, args.jobs, args.untracked_cache, args.fsmonitor)
+    if args.json:
+        json.dump([s.as_dict() for s in statuses], sys.stdout, indent=2)
+        print()
+    else:
+        print_status_table(statuses)
+
+    if any(s.failed for s in statuses):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+This module provides the command runner behind common_functions.run_os_command.
+
+- Commands are argv lists run without a shell (a string is still accepted and run through the shell,
+  as before).
+- A command failing because another git process holds index.lock is retried with exponential backoff
+  and jitter (GIT_COMMAND_RETRY_INTERVAL doubling up to GIT_COMMAND_RETRY_MAX_INTERVAL, at most
+  GIT_COMMAND_MAX_RETRIES attempts).
+- Every command has a timeout (GIT_COMMAND_TIMEOUT by default); a command that does not finish in
+  time is killed together with the processes it started (it runs in its own process group) and
+  reported with return code 124, like the timeout utility.
+- With stream=True the output is printed line by line while the command runs (and still returned).
+- run_process runs a command once with the same timeout handling, without retries or logging
+  (parallel_runner.run_git uses it).
+- Each attempt is appended to a JSONL metrics log (COMMAND_LOG_PATH, or the MCAP_COMMAND_LOG
+  environment variable): command, cwd, attempt, exit code, duration and whether it timed out.
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Sequence, Union
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from submodule_updater.constants import (
+    COMMAND_LOG_PATH, GIT_COMMAND_MAX_RETRIES, GIT_COMMAND_RETRY_INTERVAL,
+    GIT_COMMAND_RETRY_MAX_INTERVAL, GIT_COMMAND_TIMEOUT)
+
+TIMEOUT_RETURNCODE = 124
+# Seconds to wait for the output pipes to close after the command exited or was killed
+PIPE_DRAIN_TIMEOUT = 5
+
+Command = Union[str, Sequence[str]]
+
+_log_lock = threading.Lock()
+
+
+def command_text(cmd: Command) -> str:
+    return cmd if isinstance(cmd, str) else subprocess.list2cmdline(list(cmd))
+
+
+def metrics_log_path() -> Optional[str]:
+    """JSONL file the metrics are appended to, None when logging is off (empty MCAP_COMMAND_LOG)."""
+    path = os.environ.get("MCAP_COMMAND_LOG", COMMAND_LOG_PATH)
+    return path or None
+
+
+def _log_metrics(record: dict) -> None:
+    path = metrics_log_path()
+    if path is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with _log_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"[WARN] Failed to write the command log {path}: {e}", file=sys.stderr)
+
+
+def _pump(pipe, chunks: List[str], echo) -> None:
+    for line in pipe:
+        chunks.append(line)
+        if echo is not None:
+            echo.write(line)
+            echo.flush()
+    pipe.close()
+
+
+def _kill_tree(proc: subprocess.Popen) -> None:
+    """Kill proc and everything it started (git starts git-remote-https, a shell starts git, ...)."""
+    try:
+        if os.name == "nt":
+            subprocess.run(["taskkill", "/T", "/F", "/PID", str(proc.pid)],
+                           capture_output=True)
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        pass
+    proc.kill()
+
+
+def run_process(cmd: Command, cwd: Optional[str] = None, timeout: Optional[float] = None,
+                stream: bool = False) -> subprocess.CompletedProcess:
+    """
+    Run cmd once and return its text output (never raises on exit code). On timeout the
+    whole process group is killed and the return code is TIMEOUT_RETURNCODE.
+    """
+    shell = isinstance(cmd, str)
+    args = cmd if shell else list(cmd)
+    # Own process group, so that a timeout kills the grandchildren holding the pipes too
+    if os.name == "nt":
+        group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        group = {"start_new_session": True}
+    proc = subprocess.Popen(args, shell=shell, cwd=cwd, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, text=True, errors="replace", **group)
+    out: List[str] = []
+    err: List[str] = []
+    pumps = [threading.Thread(target=_pump, args=(proc.stdout, out, sys.stdout if stream else None),
+                              daemon=True),
+             threading.Thread(target=_pump, args=(proc.stderr, err, sys.stderr if stream else None),
+                              daemon=True)]
+    for t in pumps:
+        t.start()
+    try:
+        returncode = proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _kill_tree(proc)
+        proc.wait()
+        returncode = TIMEOUT_RETURNCODE
+    for t in pumps:
+        # A process that left the group may still hold the pipes: do not wait for it
+        t.join(PIPE_DRAIN_TIMEOUT)
+    stderr = "".join(err)
+    if returncode == TIMEOUT_RETURNCODE:
+        stderr += f"\nTimed out after {timeout}s."
+    return subprocess.CompletedProcess(args, returncode, "".join(out), stderr)
+
+
+def is_index_lock_error(result: subprocess.CompletedProcess) -> bool:
+    stderr = result.stderr or ""
+    return "index.lock" in stderr and "File exists" in stderr
+
+
+def backoff_delay(attempt: int) -> float:
+    """Seconds to wait after failed attempt (1-based): doubling, capped, with jitter."""
+    ceiling = min(GIT_COMMAND_RETRY_MAX_INTERVAL, GIT_COMMAND_RETRY_INTERVAL * 2 ** (attempt - 1))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def run_command(cmd: Command, cwd: Optional[str] = None, check: bool = True,
+                timeout: Optional[float] = GIT_COMMAND_TIMEOUT, stream: bool = False,
+                max_retries: int = GIT_COMMAND_MAX_RETRIES) -> subprocess.CompletedProcess:
+    """
+    Run cmd in cwd, retrying while index.lock is held by another git process.
+    Raises RuntimeError when check is set and the command fails (or times out).
+    """
+    text = command_text(cmd)
+    max_retries = max(1, max_retries)
+    for attempt in range(1, max_retries + 1):
+        start = time.monotonic()
+        result = run_process(cmd, cwd, timeout, stream)
+        seconds = time.monotonic() - start
+        _log_metrics({"time": datetime.now().isoformat(timespec="seconds"), "cmd": text,
+                      "cwd": cwd, "attempt": attempt, "returncode": result.returncode,
+                      "seconds": round(seconds, 3),
+                      "timed_out": result.returncode == TIMEOUT_RETURNCODE})
+
+        if is_index_lock_error(result):
+            if attempt < max_retries:
+                delay = backoff_delay(attempt)
+                print(f"index.lock detected. Waiting {delay:.1f} seconds before retrying... "
+                      f"(attempt {attempt}/{max_retries})")
+                time.sleep(delay)
+                continue
+            print("index.lock error persists after retries.")
+        if check and result.returncode != 0:
+            raise RuntimeError(f"Command failed: {text}\n{result.stderr}")
+        return result
@@ -6,36 +6,22 @@ from pathlib import Path
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-from openai import max_retries
-
-import subprocess
-
+from submodule_updater.command_runner import command_text, run_command
 from submodule_updater.constants import *
 
 
-def run_os_command(cmd, cwd=None, check=True):
-    print(f"[RUN] {cmd}")
-    import time
-    GIT_COMMAND_MAX_RETRIES = 5
-    GIT_COMMAND_RETRY_INTERVAL = 2
-    for attempt in range(1, GIT_COMMAND_MAX_RETRIES + 1):
-        result = subprocess.run(cmd, shell=True, cwd=cwd,
-                                capture_output=True, text=True)
+def run_os_command(cmd, cwd=None, check=True, timeout=GIT_COMMAND_TIMEOUT, stream=False):
+    """
+    Run cmd (an argv list; a string is run through the shell) in cwd and print its output.
+    index.lock conflicts are retried with backoff, and every attempt is logged, see command_runner.
+    """
+    print(f"[RUN] {command_text(cmd)}")
+    result = run_command(cmd, cwd=cwd, check=False, timeout=timeout, stream=stream)
+    if not stream:
         if result.stdout:
             print(result.stdout)
         if result.stderr:
             print(result.stderr)
-
-        if "index.lock" in (result.stderr or "") and "File exists" in (result.stderr or ""):
-            if attempt < GIT_COMMAND_MAX_RETRIES:
-                print(
-                    f"index.lock detected. Waiting {GIT_COMMAND_RETRY_INTERVAL} seconds before retrying... (attempt {attempt}/{GIT_COMMAND_MAX_RETRIES})")
-                time.sleep(GIT_COMMAND_RETRY_INTERVAL)
-                continue
-            else:
-                print("index.lock error persists after retries.")
-        if check and result.returncode != 0:
-            raise RuntimeError(f"Command failed: {cmd}\n{result.stderr}")
-        return result
-    raise RuntimeError(
-        f"Command failed after {GIT_COMMAND_MAX_RETRIES} retries due to index.lock: {cmd}\n{result.stderr}")
+    if check and result.returncode != 0:
+        raise RuntimeError(f"Command failed: {command_text(cmd)}\n{result.stderr}")
+    return result
@@ -1,3 +1,5 @@
+import os
+
 TEST_REPOSITORY_TO_UPDATE_LIST = [
     "../test_repo",
 ]
@@ -12,6 +14,15 @@ PULL_ALL_SUBMODULES_PATH = ".\git_supporter\pull_all_submodules.py"
 
 GIT_COMMAND_MAX_RETRIES = 5
 GIT_COMMAND_RETRY_INTERVAL = 2
+GIT_COMMAND_RETRY_MAX_INTERVAL = 30
+GIT_COMMAND_TIMEOUT = 600
+PULL_ALL_SUBMODULES_TIMEOUT = 3600
+# Seconds to wait for a repository another script is working in
+REPOSITORY_LOCK_TIMEOUT = 3600
+
+# JSONL log of every command run by run_os_command ("" disables it)
+COMMAND_LOG_PATH = os.path.join(os.path.expanduser("~"), ".cache", "MCAP_repo_manager",
+                                "command_log.jsonl")
 
 CHECK_ACTIONS_INTERVAL_TIME = 3
 CHECK_ACTIONS_MAX_TRY = 100
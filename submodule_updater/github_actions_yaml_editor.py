@@ -63,12 +63,12 @@ def update_github_actions_yaml(repo_path, branch_name):
         brush_up_yaml_text(changed_files)
 
         cwd = os.path.abspath(repo_path)
-        run_os_command("git add .github/workflows", cwd)
+        run_os_command(["git", "add", ".github/workflows"], cwd)
         run_os_command(
-            f"git commit -m \"Update GitHub Actions workflow branches for {branch_name}\"", cwd)
-        run_os_command(f"git push", cwd)
+            ["git", "commit", "-m", f"Update GitHub Actions workflow branches for {branch_name}"], cwd)
+        run_os_command(["git", "push"], cwd)
         # Get the latest commit sha after push
-        sha_result = run_os_command("git rev-parse HEAD", cwd)
+        sha_result = run_os_command(["git", "rev-parse", "HEAD"], cwd)
         head_sha = sha_result.stdout.strip()
         print(f"Updated workflow files: {changed_files}")
     else:
@@ -114,10 +114,10 @@ def revert_github_actions_yaml(repo_path, branch_name):
         brush_up_yaml_text(changed_files)
 
         cwd = os.path.abspath(repo_path)
-        run_os_command("git add .github/workflows", cwd)
+        run_os_command(["git", "add", ".github/workflows"], cwd)
         run_os_command(
-            f"git commit -m \"Revert GitHub Actions workflow branches to develop only\"", cwd)
-        run_os_command(f"git push", cwd)
+            ["git", "commit", "-m", "Revert GitHub Actions workflow branches to develop only"], cwd)
+        run_os_command(["git", "push"], cwd)
         print(f"Reverted workflow files: {changed_files}")
     else:
         print("No workflow files needed reverting.")